@@ -4,7 +4,7 @@
 
 import modules.config as cfg
 
-
+from re import compile as reg_compile
 from logging import getLogger
 
 
@@ -12,15 +12,122 @@ log = getLogger("pog_bot")
 
 MAX_SELECTED = 15
 
+# Queries shorter than this are never matched with typos
+MIN_FUZZY_LENGTH = 4
+
+_NON_AL_NUM = reg_compile("[^a-z0-9]+")
+
+
+def _normalize(name):
+    """ Lower case, remove apostrophes and replace any other special character by a single space
+    """
+    name = name.lower().replace("'", "")
+    return " ".join(_NON_AL_NUM.sub(" ", name).split())
+
+
+def _trigrams(name):
+    return {name[i:i + 3] for i in range(len(name) - 2)}
+
+
+def _edit_distance(a, b):
+    """ Levenshtein distance between two strings
+    """
+    if len(a) < len(b):
+        a, b = b, a
+    previous = list(range(len(b) + 1))
+    for i, c_a in enumerate(a, 1):
+        current = [i]
+        for j, c_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (c_a != c_b)))
+        previous = current
+    return previous[-1]
+
+
+class BaseSearchIndex:
+    """ Search index over normalized base names.
+        Substring queries are narrowed down with a trigram index, misspelled queries are ranked by edit distance.
+    """
+
+    def __init__(self, bases):
+        self.__names = dict()
+        self.__words = dict()
+        self.__trigrams = dict()
+        for base in bases:
+            name = _normalize(base.name)
+            self.__names[base.id] = name
+            self.__words[base.id] = name.split()
+            for trigram in _trigrams(name):
+                if trigram not in self.__trigrams:
+                    self.__trigrams[trigram] = set()
+                self.__trigrams[trigram].add(base.id)
+
+    def __candidates(self, query, restrict, fuzzy):
+        trigrams = _trigrams(query)
+        if not trigrams:
+            candidates = set(self.__names.keys())
+        elif fuzzy:
+            # Any base sharing at least a trigram with the query
+            candidates = set()
+            for trigram in trigrams:
+                candidates.update(self.__trigrams.get(trigram, ()))
+        else:
+            # For a substring match, all trigrams of the query must be in the name
+            candidates = None
+            for trigram in trigrams:
+                ids = self.__trigrams.get(trigram, set())
+                candidates = ids.copy() if candidates is None else candidates & ids
+                if not candidates:
+                    break
+        if restrict is not None:
+            candidates &= restrict
+        return candidates
+
+    def search(self, name, restrict=None, fuzzy=False):
+        """ Return a list of matching base ids, best matches first.
+
+            :param name: Query string.
+            :param restrict: (Optional) Set of base ids to search into.
+            :param fuzzy: If no base name contains the query, try to find the closest names.
+        """
+        query = _normalize(name)
+        if not query:
+            return list()
+
+        ranked = list()
+        for b_id in self.__candidates(query, restrict, fuzzy=False):
+            position = self.__names[b_id].find(query)
+            if position != -1:
+                ranked.append((position != 0, len(self.__names[b_id]), b_id))
+        if ranked or not fuzzy or len(query) < MIN_FUZZY_LENGTH:
+            return [b_id for *_, b_id in sorted(ranked)]
+
+        # Compare the query with every group of consecutive words having the same word count
+        n_words = len(query.split())
+        max_distance = max(1, len(query) // 3)
+        for b_id in self.__candidates(query, restrict, fuzzy=True):
+            words = self.__words[b_id]
+            windows = {" ".join(words[i:i + n_words]) for i in range(max(1, len(words) - n_words + 1))}
+            distance = min(_edit_distance(query, window) for window in windows)
+            if distance <= max_distance:
+                ranked.append((distance, len(self.__names[b_id]), b_id))
+        if not ranked:
+            return list()
+        # Only keep the closest matches
+        best = min(ranked)[0]
+        return [b_id for distance, _, b_id in sorted(ranked) if distance == best]
+
 
 class Base:
     _all_bases_list = dict()
     _base_pool = list()
+    _search_index = None
+    _pool_ids = set()
 
     @classmethod
     def clear_all(cls):
         cls._all_bases_list.clear()
         cls._base_pool.clear()
+        cls._search_index = None
 
     @classmethod
     def get(cls, m_id: int):
@@ -29,16 +136,19 @@ class Base:
         return None
 
     @classmethod
-    def get_bases_from_name(cls, name, base_pool=False):
-        results = list()
-        name = name.lower()
-        if not name or name.isspace():
-            return results
-        for base in (cls._base_pool if base_pool else cls._all_bases_list.values()):
-            b_name = base.name.lower()
-            if name in b_name or name in b_name.replace("'", ""):
-                results.append(base)
-        return results
+    def build_search_index(cls):
+        cls._search_index = BaseSearchIndex(cls._all_bases_list.values())
+        cls._pool_ids = {base.id for base in cls._base_pool}
+
+    @classmethod
+    def get_bases_from_name(cls, name, base_pool=False, fuzzy=False):
+        """ Return the bases whose name contains name, best matches first.
+            If fuzzy is True and no name contains name, return the closest names instead (typo tolerance).
+        """
+        if cls._search_index is None:
+            cls.build_search_index()
+        restrict = cls._pool_ids if base_pool else None
+        return [cls._all_bases_list[b_id] for b_id in cls._search_index.search(name, restrict, fuzzy)]
 
     @classmethod
     def get_bases(cls):
@@ -57,6 +167,7 @@ class Base:
         if self.__in_pool:
             Base._base_pool.append(self)
         Base._all_bases_list[self.__id] = self
+        Base._search_index = None
 
     def get_data(self):  # get data for database push
         data = {"_id": self.__id,
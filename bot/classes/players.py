@@ -8,8 +8,8 @@
 import modules.config as cfg
 from modules.asynchttp import api_request_and_retry as http_request, ApiNotReachable
 from modules.tools import UnexpectedError
-from lib.tasks import loop
-from modules.roles import role_update
+from modules.roles import queue_update
+import modules.lobby as lobby
 import modules.database as db
 import modules.tools as tools
 import re
@@ -169,6 +169,9 @@ class Player:
         if not re.match(cfg.name_regex, new_name):
             return False
         self.__name = new_name
+        # Names displayed in lobby must be rebuilt
+        if self.is_lobbied:
+            lobby.refresh_names(self)
         await self.db_update("name")
         return True
 
@@ -256,14 +259,7 @@ class Player:
         return accs
 
     def update_role(self):
-        try:
-            self.role_task.start()
-        except RuntimeError:  # if task is already active
-            log.warning(f"Player task conflict: {self.name}")
-
-    @loop(count=1)
-    async def role_task(self):
-        await role_update(self)
+        queue_update(self)
 
     def on_lobby_leave(self):
         self.__lobby_stamp = 0
@@ -19,6 +19,8 @@ class PlayerStat:
             self.matches = list()
             self.time_played = 0
             self.loadouts = dict()
+        # Score of each match added with add_data, not saved in database
+        self.match_scores = dict()
 
     @property
     def nb_matches_played(self):
@@ -91,6 +93,7 @@ class PlayerStat:
     def add_data(self, match_id, time_played, dta):
         self.matches.append(match_id)
         self.time_played += time_played
+        self.match_scores[match_id] = sum(l_data["score"] for l_data in dta["loadouts"])
         for l_data in dta["loadouts"]:
             l_id = l_data["loadout_id"]
             if l_id in self.loadouts:
@@ -45,6 +45,7 @@ class Team:
     @faction.setter
     def faction(self, faction):
         self.__faction = faction
+        self.__match.journal()
 
     @property
     def team_score(self):
@@ -90,6 +91,7 @@ class Team:
     @is_turn.setter
     def is_turn(self, bl):
         self.__is_turn = bl
+        self.__match.bump_version()
 
     @property
     def players_to_dict(self):
@@ -106,9 +108,11 @@ class Team:
             return False
         else:
             self.__players.append(self.__players.pop(0))
+            self.__match.journal()
             return True
 
     def on_player_bench(self, player):
+        self.__match.bump_version()
         if player is self.__players[-1]:
             return
         else:
@@ -123,6 +127,7 @@ class Team:
 
     def on_team_ready(self, ready):
         self.__is_playing = ready
+        self.__match.bump_version()
         for a_player in self.__players:
             a_player.on_team_ready(ready)
 
@@ -143,6 +148,7 @@ class Team:
     def add_player(self, p_class, player):
         active = p_class(player, self)
         self.__players.append(active)
+        self.__match.journal()
 
     def sub(self, subbed, new_player):
         i = 0
@@ -152,9 +158,11 @@ class Team:
         if subbed.is_captain:
             active.is_turn = subbed.is_turn
         self.__players[i] = active
+        self.__match.journal()
 
     def swap_player(self, p_out, p_in):
         i = 0
         while self.__players[i] is not p_out:
             i += 1
         self.__players[i] = p_in
+        self.__match.journal()
@@ -4,7 +4,7 @@ from discord.ext import commands
 from logging import getLogger
 from datetime import datetime as dt
 
-from display import AllStrings as disp, ContextWrapper
+from display import AllStrings as disp, outbound
 from match import MatchStatus
 
 import classes
@@ -17,9 +17,11 @@ import modules.lobby as lobby
 import modules.tools as tools
 import modules.accounts_handler as accounts_sheet
 import modules.spam_checker as spam_checker
+import modules.jaeger_calendar as jaeger_calendar
 import asyncio
 
 from match.classes.match import Match
+import match.plugins.manager as plugin_manager
 
 from classes import Player
 
@@ -47,18 +49,19 @@ class AdminCog(commands.Cog, name='admin'):
 
     @commands.command()
     @commands.guild_only()
-    @commands.max_concurrency(number=1, wait=True)
     async def clear(self, ctx):
-        if ctx.channel.id == cfg.channels["lobby"]:  # clear lobby
-            if lobby.clear_lobby():
-                await disp.LB_CLEARED.send(ctx, names_in_lobby=lobby.get_all_names_in_lobby())
+        lb = lobby.get_lobby(ctx.channel.id)
+        if lb:  # clear lobby
+            if lb.clear_lobby():
+                await disp.LB_CLEARED.send(ctx, names_in_lobby=lb.get_all_names_in_lobby(), lobby=lb)
                 return
             await disp.LB_EMPTY.send(ctx)
             return
         # clear a match channel
         if ctx.channel.id in cfg.channels["matches"]:
             match = Match.get(ctx.channel.id)
-            await match.command.clear(ctx)
+            async with match.command_queue():
+                await match.command.clear(ctx)
             return
         await disp.WRONG_CHANNEL_2.send(ctx, ctx.command.name, f"<#{ctx.channel.id}>")
 
@@ -71,9 +74,9 @@ class AdminCog(commands.Cog, name='admin'):
         if not player:
             return
         if player.is_lobbied:
-            lobby.remove_from_lobby(player)
-            await disp.RM_LOBBY.send(ContextWrapper.channel(cfg.channels["lobby"]), player.mention,
-                                     names_in_lobby=lobby.get_all_names_in_lobby())
+            lb = lobby.remove_from_lobby(player)
+            await disp.RM_LOBBY.send(lb.channel, player.mention, names_in_lobby=lb.get_all_names_in_lobby(),
+                                     lobby=lb)
         if not player.match:
             try:
                 await db.async_db_call(db.remove_element, "users", player.id)
@@ -148,28 +151,29 @@ class AdminCog(commands.Cog, name='admin'):
     @commands.command()
     @commands.guild_only()
     async def lobby(self, ctx, *args):
-        if ctx.channel.id != cfg.channels["lobby"]:
-            await disp.WRONG_CHANNEL.send(ctx, ctx.command.name, f'<#{cfg.channels["lobby"]}>')
+        lb = lobby.get_lobby(ctx.channel.id)
+        if not lb:
+            await disp.WRONG_CHANNEL.send(ctx, ctx.command.name, f'<#{lobby.get_main_lobby().channel_id}>')
             return
         if len(args) > 0 and args[0] == "restore":
             for mention in ctx.message.mentions:
                 try:
                     p_id = mention.id
                     player = Player.get(int(p_id))
-                    if player and not lobby.is_lobby_stuck() and player.is_registered and not player.is_lobbied:
-                        lobby.add_to_lobby(player)
+                    if player and not lb.is_lobby_stuck() and player.is_registered and not player.is_lobbied:
+                        lb.add_to_lobby(player)
                 except ValueError:
                     pass
-            await disp.LB_QUEUE.send(ctx, names_in_lobby=lobby.get_all_names_in_lobby())
+            await disp.LB_QUEUE.send(ctx, names_in_lobby=lb.get_all_names_in_lobby(), lobby=lb)
             return
         if len(args) > 0 and args[0] == "save":
-            lb = lobby.get_all_ids_in_lobby()
-            await db.async_db_call(db.set_field, "restart_data", 0, {"last_lobby": lb})
+            ids = lb.get_all_ids_in_lobby()
+            await db.async_db_call(db.set_field, "restart_data", 0, {"last_lobby": ids})
             await disp.LB_SAVE.send(ctx)
             return
         if len(args) > 0 and args[0] == "get":
-            lb = lobby.get_all_ids_in_lobby()
-            await disp.LB_GET.send(ctx, " ".join([str(p_id) for p_id in lb]))
+            ids = lb.get_all_ids_in_lobby()
+            await disp.LB_GET.send(ctx, " ".join([str(p_id) for p_id in ids]))
             return
         await disp.WRONG_USAGE.send(ctx, ctx.command.name)
 
@@ -188,9 +192,9 @@ class AdminCog(commands.Cog, name='admin'):
             player = Player(ctx.message.mentions[0].id, ctx.message.mentions[0].name)
             await db.async_db_call(db.set_element, "users", player.id, player.get_data())
         if player.is_lobbied:
-            lobby.remove_from_lobby(player)
-            await disp.RM_LOBBY.send(ContextWrapper.channel(cfg.channels["lobby"]), player.mention,
-                                     names_in_lobby=lobby.get_all_names_in_lobby())
+            lb = lobby.remove_from_lobby(player)
+            await disp.RM_LOBBY.send(lb.channel, player.mention, names_in_lobby=lb.get_all_names_in_lobby(),
+                                     lobby=lb)
         if player.match:
             await disp.RM_IN_MATCH.send(ctx)
             return
@@ -206,6 +210,7 @@ class AdminCog(commands.Cog, name='admin'):
         # =timeout @player remove
         if len(args) == 1 and args[0] == 'remove':
             player.timeout = 0
+            roles.schedule_timeout_end(player)
             await player.db_update("timeout")
             await disp.RM_TIMEOUT_FREE.send(ctx, player.mention)
             await roles.role_update(player)
@@ -220,6 +225,7 @@ class AdminCog(commands.Cog, name='admin'):
 
         end_time = tools.timestamp_now() + time
         player.timeout = end_time
+        roles.schedule_timeout_end(player)
         await roles.role_update(player)
         await player.db_update("timeout")
         await roles.perms_muted(True, player.id)
@@ -235,6 +241,26 @@ class AdminCog(commands.Cog, name='admin'):
         if arg == "version":
             await disp.BOT_VERSION.send(ctx, cfg.VERSION, loader.is_all_locked())
             return
+        if arg == "queues":
+            stats = outbound.get_stats()
+            busy = ", ".join(f"<#{ch_id}> ({depth})" for ch_id, depth in stats["depths"].items()) or "none"
+            await disp.BOT_QUEUES.send(ctx, stats["sent"], stats["coalesced"], stats["retries"],
+                                       stats["rate_limited"], stats["max_depth"], stats["max_wait"], busy)
+            cmd_stats = list()
+            for ch_id in cfg.channels["matches"]:
+                m_stats = Match.get(ch_id).command_stats
+                avg_wait = m_stats["total_wait"] / m_stats["commands"] if m_stats["commands"] else 0
+                cmd_stats.append(f"<#{ch_id}>: `{m_stats['commands']}` commands, `{m_stats['waiting']}` waiting, "
+                                 f"average wait `{avg_wait:.2f}s`, max wait `{m_stats['max_wait']:.2f}s`")
+            await disp.BOT_CMD_QUEUES.send(ctx, "\n".join(cmd_stats))
+            plugin_stats = list()
+            for name, p_stats in plugin_manager.get_stats().items():
+                avg_latency = p_stats["total_latency"] / p_stats["delivered"] if p_stats["delivered"] else 0
+                plugin_stats.append(f"{name}: `{p_stats['delivered']}` events, `{p_stats['dropped']}` dropped, "
+                                    f"max queue depth `{p_stats['max_depth']}`, average latency `{avg_latency:.2f}s`, "
+                                    f"max latency `{p_stats['max_latency']:.2f}s`")
+            await disp.BOT_PLUGIN_QUEUES.send(ctx, "\n".join(plugin_stats) or "none")
+            return
         if arg == "lock":
             if loader.is_all_locked():
                 await disp.BOT_ALREADY.send(ctx, "locked")
@@ -254,7 +280,8 @@ class AdminCog(commands.Cog, name='admin'):
     @commands.command()
     @commands.guild_only()
     async def channel(self, ctx, *args):
-        if ctx.channel.id not in [cfg.channels["register"], cfg.channels["lobby"], *cfg.channels["matches"]]:
+        if ctx.channel.id not in [cfg.channels["register"], *(lb["channel"] for lb in cfg.lobbies.values()),
+                                  *cfg.channels["matches"]]:
             await disp.WRONG_CHANNEL_2.send(ctx, ctx.command.name, f"<#{ctx.channel.id}>")
             return
         if len(args) == 1:
@@ -287,6 +314,8 @@ class AdminCog(commands.Cog, name='admin'):
             if arg == "bases":
                 classes.Base.clear_all()
                 await loop.run_in_executor(None, db.get_all_elements, classes.Base, "static_bases")
+                classes.Base.build_search_index()
+                jaeger_calendar.invalidate()
                 await disp.BOT_RELOAD.send(ctx, "Bases")
                 return
             if arg == "config":
@@ -300,14 +329,14 @@ class AdminCog(commands.Cog, name='admin'):
     @commands.command(aliases=['rm'])
     @commands.guild_only()
     async def remove(self, ctx):
-        if ctx.channel.id == cfg.channels["lobby"]:
+        if lobby.get_lobby(ctx.channel.id):
             player = await get_check_player(ctx)
             if not player:
                 return
             if player.is_lobbied:
-                lobby.remove_from_lobby(player)
-                await disp.RM_LOBBY.send(ContextWrapper.channel(cfg.channels["lobby"]), player.mention,
-                                         names_in_lobby=lobby.get_all_names_in_lobby())
+                lb = lobby.remove_from_lobby(player)
+                await disp.RM_LOBBY.send(lb.channel, player.mention, names_in_lobby=lb.get_all_names_in_lobby(),
+                                         lobby=lb)
                 return
             await disp.RM_NOT_LOBBIED.send(ctx)
             return
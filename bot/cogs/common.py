@@ -22,11 +22,13 @@ class MatchesCog(commands.Cog, name='common'):
     @commands.command(aliases=['i'])
     @commands.guild_only()
     async def info(self, ctx):
-        if ctx.channel.id == cfg.channels["lobby"]:
+        lb = lobby.get_lobby(ctx.channel.id)
+        if lb:
             match_list = list()
-            for ch in cfg.channels["matches"]:
+            for ch in lb.match_channels:
                 match_list.append(Match.get(ch))
-            await disp.GLOBAL_INFO.send(ctx, lobby=lobby.get_all_names_in_lobby(), match_list=match_list)
+            await disp.GLOBAL_INFO.send(ctx, names_in_lobby=lb.get_all_names_in_lobby(), match_list=match_list,
+                                        lobby=lb)
             return
 
         if ctx.channel.id in cfg.channels["matches"]:
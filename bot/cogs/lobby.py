@@ -24,7 +24,7 @@ class LobbyCog(commands.Cog, name='lobby'):
         self.client = client
 
     async def cog_check(self, ctx):
-        return ctx.channel.id == cfg.channels['lobby']
+        return lobby.get_lobby(ctx.channel.id) is not None
 
     """
     commands:
@@ -39,7 +39,8 @@ class LobbyCog(commands.Cog, name='lobby'):
     async def join(self, ctx):
         """ Join queue
         """
-        if lobby.get_lobby_len() > cfg.general["lobby_size"]:  # This should not happen EVER
+        lb = lobby.get_lobby(ctx.channel.id)
+        if lb.get_lobby_len() > lb.size:  # This should not happen EVER
             await disp.UNKNOWN_ERROR.send(ctx, "Lobby Overflow")
             return
         player = Player.get(ctx.message.author.id)
@@ -59,12 +60,12 @@ class LobbyCog(commands.Cog, name='lobby'):
         if player.match:
             await disp.LB_IN_MATCH.send(ctx)
             return
-        if lobby.is_lobby_stuck():
+        if lb.is_lobby_stuck():
             await disp.LB_STUCK_JOIN.send(ctx)
             return
 
-        names = lobby.add_to_lobby(player)
-        await disp.LB_ADDED.send(ctx, names_in_lobby=names)
+        names = lb.add_to_lobby(player)
+        await disp.LB_ADDED.send(ctx, names_in_lobby=names, lobby=lb)
 
     @commands.command(aliases=['rst'])
     @commands.guild_only()
@@ -88,8 +89,8 @@ class LobbyCog(commands.Cog, name='lobby'):
             await disp.LB_NOT_IN.send(ctx)
             return
         if player.is_lobbied:
-            lobby.remove_from_lobby(player)
-            await disp.LB_REMOVED.send(ctx, names_in_lobby=lobby.get_all_names_in_lobby())
+            lb = lobby.remove_from_lobby(player)
+            await disp.LB_REMOVED.send(ctx, names_in_lobby=lb.get_all_names_in_lobby(), lobby=lb)
             return
         await disp.LB_NOT_IN.send(ctx)
 
@@ -98,14 +99,15 @@ class LobbyCog(commands.Cog, name='lobby'):
     async def queue(self, ctx):
         """ disp queue
         """
-        if lobby.get_lobby_len() > cfg.general["lobby_size"]:
+        lb = lobby.get_lobby(ctx.channel.id)
+        if lb.get_lobby_len() > lb.size:
             await disp.UNKNOWN_ERROR.send(ctx, "Lobby Overflow")
             return
-        if lobby.is_lobby_stuck():
-            await disp.LB_QUEUE.send(ctx, names_in_lobby=lobby.get_all_names_in_lobby())
+        if lb.is_lobby_stuck():
+            await disp.LB_QUEUE.send(ctx, names_in_lobby=lb.get_all_names_in_lobby(), lobby=lb)
             await disp.LB_STUCK.send(ctx)
             return
-        await disp.LB_QUEUE.send(ctx, names_in_lobby=lobby.get_all_names_in_lobby())
+        await disp.LB_QUEUE.send(ctx, names_in_lobby=lb.get_all_names_in_lobby(), lobby=lb)
 
 
 def setup(client):
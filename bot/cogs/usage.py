@@ -2,6 +2,8 @@
 
 # discord.py
 from discord.ext import commands
+from discord import File
+from io import BytesIO
 from logging import getLogger
 from datetime import datetime as dt
 
@@ -10,8 +12,10 @@ import modules.config as cfg
 import modules.database as db
 import modules.tools as tools
 import modules.stat_processor as stat_processor
+import modules.image_maker as i_maker
 
 from classes import PlayerStat, Player
+from match.classes import Match
 
 from display import AllStrings as disp, ContextWrapper
 
@@ -55,7 +59,12 @@ class RegisterCog(commands.Cog, name='usage'):
             await disp.RM_MENTION_ONE.send(ctx)
             return
 
-        stat_player = await PlayerStat.get_from_database(p_id, "N/A")
+        player = Player.get(p_id)
+        if player:
+            name = player.name
+        else:
+            name = "Unknown"
+        stat_player = await PlayerStat.get_from_database(p_id, name)
         if stat_player.nb_matches_played == 0:
             await disp.NO_DATA.send(ctx)
             return
@@ -81,7 +90,19 @@ class RegisterCog(commands.Cog, name='usage'):
         if num > 1:
             suffix = "es"
 
-        await disp.DISPLAY_USAGE.send(ctx, p_id, num_str, suffix, t_str, dt.utcfromtimestamp(time).strftime("%Y-%m-%d %H:%M UTC"))
+        time_str = dt.utcfromtimestamp(time).strftime("%Y-%m-%d %H:%M UTC")
+        try:
+            key = i_maker.stats_card_key(stat_player, stat_processor.get_recent_matches(stat_player))
+            data = i_maker.get_stats_card(key)
+            if data is None:
+                recent_stats = await stat_processor.get_new_stats(Match, stat_player)
+                data = await i_maker.render_stats_card(key, stat_player, recent_stats)
+        except Exception as e:
+            log.error(f"Could not render stats card of player {p_id}: {e}")
+            await disp.DISPLAY_USAGE.send(ctx, p_id, num_str, suffix, t_str, time_str)
+            return
+        image = File(BytesIO(data), filename=i_maker.stats_card_filename(p_id))
+        await disp.DISPLAY_USAGE.image_send(ctx, image, p_id, num_str, suffix, t_str, time_str)
 
     @commands.command()
     @commands.guild_only()
@@ -1,10 +1,11 @@
-from discord import File, ui
+from discord import File, HTTPException, ui
 import modules.config as cfg
 from logging import getLogger
 from aiohttp.client_exceptions import ClientError
 from discord.backoff import ExponentialBackoff
 import asyncio
 from modules.tools import UnexpectedError
+from display import outbound
 
 log = getLogger("pog_bot")
 
@@ -12,20 +13,27 @@ log = getLogger("pog_bot")
 class Message:
     """ Class for the enum to use
     """
-    def __init__(self, string, ping=True, embed=None):
+    def __init__(self, string, ping=True, embed=None, priority=outbound.NORMAL):
         self.__str = string
         self.__embed_fct = embed
         self.__ping = ping
+        self.priority = priority
 
     def get_ui(self, ctx, elements, kwargs):
         if self.__embed_fct:
             embed = self.__embed_fct(ctx, **kwargs)
-            # Fixes the embed mobile bug:
-            embed.set_author(name="Planetside Open Games",
-            url="https://docs.google.com/document/d/13rsrWA4r16gpB-F3gvx5HWf2T974mdHLraPSjh5DO1Q/",
-            icon_url = "https://media.discordapp.net/attachments/739231714554937455/739522071423614996/logo_png.png")
-
-            elements['embed'] = embed
+            # Embed functions can return several embeds
+            embed_list = embed if isinstance(embed, list) else [embed]
+            for embed in embed_list:
+                # Fixes the embed mobile bug:
+                embed.set_author(name="Planetside Open Games",
+                url="https://docs.google.com/document/d/13rsrWA4r16gpB-F3gvx5HWf2T974mdHLraPSjh5DO1Q/",
+                icon_url = "https://media.discordapp.net/attachments/739231714554937455/739522071423614996/logo_png.png")
+
+            if len(embed_list) == 1:
+                elements['embed'] = embed_list[0]
+            else:
+                elements['embeds'] = embed_list
         if ctx.interaction_payload:
             try:
                 view = ctx.interaction_payload.view(ctx)
@@ -47,20 +55,38 @@ class Message:
 
             elements['content'] = string
 
-    def get_image(self, ctx, elements, image_path):
-        if image_path:
-            elements['file'] = File(image_path)
+    def get_image(self, ctx, elements, image):
+        if isinstance(image, File):
+            elements['file'] = image
+        elif image:
+            elements['file'] = File(image)
 
     def get_elements(self, ctx, **kwargs):
 
         elements = dict()
         self.get_string(ctx, elements, kwargs.get('string_args'))
         self.get_ui(ctx, elements, kwargs.get('ui_kwargs'))
-        self.get_image(ctx, elements, kwargs.get('image_path'))
+        self.get_image(ctx, elements, kwargs.get('image'))
 
         return elements
 
 
+class _UserFetcher:
+    """ Stand-in for a user missing from the cache, the user is fetched when a message is sent
+    """
+    def __init__(self, client, user_id):
+        self.client = client
+        self.id = user_id
+
+    @property
+    def mention(self):
+        return f"<@{self.id}>"
+
+    async def send(self, **kwargs):
+        user = await self.client.fetch_user(self.id)
+        return await user.send(**kwargs)
+
+
 class ContextWrapper:
 
     client = None
@@ -105,6 +131,9 @@ class ContextWrapper:
     @classmethod
     def user(cls, user_id):
         user = cls.client.get_user(user_id)
+        if user is None:
+            # Not cached in low-memory mode, fetched when sending
+            user = _UserFetcher(cls.client, user_id)
         return cls(user, "?", user_id, None, user)
 
     @classmethod
@@ -120,25 +149,42 @@ class ContextWrapper:
         self.message = message
         self.interaction_payload = None
 
-    async def send(self, **kwargs):
-        return await self._do_send('send', kwargs)
+    async def send(self, priority=outbound.NORMAL, **kwargs):
+        return await self._scheduled_send('send', kwargs, priority)
 
-    async def edit(self, **kwargs):
-        return await self._do_send('edit', kwargs)
+    async def edit(self, priority=outbound.NORMAL, **kwargs):
+        return await self._scheduled_send('edit', kwargs, priority)
+
+    async def _scheduled_send(self, command, kwargs, priority):
+        if not self.channel_id:
+            msg = await self._do_send(command, kwargs)
+        else:
+            msg = await outbound.submit(self, command, kwargs, priority)
+        if self.interaction_payload:
+            self.interaction_payload.message_callback(msg, kwargs)
+        return msg
 
     async def _do_send(self, command, kwargs):
         backoff = ExponentialBackoff()
         for i in range(5):
             try:
                 if i != 0:
+                    outbound.record_retry()
                     await asyncio.sleep(backoff.delay())
-                msg = await getattr(self.original_ctx, command)(**kwargs)
-                if self.interaction_payload:
-                    self.interaction_payload.message_callback(msg, kwargs)
-                return msg
+                    # Rewind the files, they might have been partially read
+                    for file in [kwargs.get('file'), *kwargs.get('attachments', [])]:
+                        if isinstance(file, File):
+                            file.reset()
+                return await getattr(self.original_ctx, command)(**kwargs)
             except ClientError as e:
                 log.warning(f"ContextWrapper: Network error when sending message on try {i}!"
                             f"\n {e}")
+            except HTTPException as e:
+                # Rate limit still hit after the retries of discord.py
+                if e.status != 429:
+                    raise
+                outbound.record_rate_limit()
+                log.warning(f"ContextWrapper: Rate limited when sending message on try {i}!")
         log.error(f"ContextWrapper: Network error when sending message after 5 retries! Giving up...")
         raise UnexpectedError("ContextWrapper could not send message after 5 retries!")
 
@@ -153,10 +199,14 @@ class InteractionContext(ContextWrapper):
         self.ephemeral = ephemeral
         super().__init__(author, cmd_name, channel_id, message, ctx)
 
-    async def send(self, **kwargs):
+    async def send(self, priority=outbound.NORMAL, **kwargs):
         if self.ephemeral:
             kwargs['ephemeral'] = True
-        return await self._do_send('send_message', kwargs)
+        # Interaction responses are not queued, they must be sent within a few seconds
+        msg = await self._do_send('send_message', kwargs)
+        if self.interaction_payload:
+            self.interaction_payload.message_callback(msg, kwargs)
+        return msg
 
 
 
@@ -71,6 +71,7 @@ def admin_help(ctx):
                     value='`=channel (un)freeze` - Prevent users from typing in a channel\n'
                           '`=pog version` - Display current version and lock status\n'
                           '`=pog (un)lock` - Prevent users from interacting with the bot (but admins still can)\n'
+                          '`=pog queues` - Display the outbound message, match command and plugin queues stats\n'
                           '`=reload accounts`/`bases`/`weapons`/`config` - Reload specified element from the database\n'
                           '`=spam clear` - Clear the spam filter\n',
                     inline=False)
@@ -258,13 +259,19 @@ def account(ctx, account):
     return embed
 
 
+def accounts(ctx, accounts):
+    """ Returns one account embed per account
+    """
+    return [account(ctx, acc) for acc in accounts]
+
+
 def auto_help(ctx, is_dm=False):
     """ Return help embed depending on current channel """
     if is_dm:
         return dm_help(ctx)
     if ctx.channel_id == cfg.channels['register']:
         return register_help(ctx)
-    if ctx.channel_id == cfg.channels['lobby']:
+    if ctx.channel_id in (lb["channel"] for lb in cfg.lobbies.values()):
         return lobby_help(ctx)
     if ctx.channel_id in cfg.channels['matches']:
         return match_help(ctx)
@@ -280,14 +287,31 @@ def auto_help(ctx, is_dm=False):
     return default_help(ctx)
 
 
-def lobby_list(ctx, names_in_lobby):
-    """ Returns the lobby list """
-    embed = Embed(colour=Color.blue())
+# Lobby fields by lobby name: (lobby version, field name, field value)
+_lobby_fields = dict()
+
+
+def _lobby_field(names_in_lobby, lobby_size, lobby_name):
+    """ Returns the name and value of the lobby field """
     list_of_names = "\n".join(names_in_lobby)
     if list_of_names == "":
         list_of_names = "Queue is empty"
-    embed.add_field(name=f'Lobby: {len(names_in_lobby)} / {cfg.general["lobby_size"]}', value=list_of_names,
-                    inline=False)
+    return f'{lobby_name}: {len(names_in_lobby)} / {lobby_size}', list_of_names
+
+
+def lobby_list(ctx, names_in_lobby, lobby=None):
+    """ Returns the lobby list, lobby is the Lobby object (default lobby size and name if None) """
+    embed = Embed(colour=Color.blue())
+    if lobby:
+        version, name, value = _lobby_fields.get(lobby.name, (-1, None, None))
+        if version != lobby.version:
+            name, value = _lobby_field(names_in_lobby, lobby.size, lobby.display_name)
+            # Only cache the names of the current version of the lobby
+            if names_in_lobby is lobby.get_all_names_in_lobby():
+                _lobby_fields[lobby.name] = (lobby.version, name, value)
+    else:
+        name, value = _lobby_field(tuple(names_in_lobby), cfg.general["lobby_size"], "Lobby")
+    embed.add_field(name=name, value=value, inline=False)
     return embed
 
 
@@ -304,13 +328,13 @@ def offline_list(ctx, p_list):
     return embed
 
 
-def global_info(ctx, lobby, match_list):
+def global_info(ctx, names_in_lobby, match_list, lobby=None):
     embed = Embed(
         colour=Color.greyple(),
         title='Global Info',
         description=f'POG bot version `{cfg.VERSION}`'
     )
-    lb_embed = lobby_list(ctx, names_in_lobby=lobby).fields[0]
+    lb_embed = lobby_list(ctx, names_in_lobby=names_in_lobby, lobby=lobby).fields[0]
     embed.add_field(name=lb_embed.name, value=lb_embed.value, inline=lb_embed.inline)
     for m in match_list:
         desc = ""
@@ -503,8 +527,11 @@ def psb_usage(ctx, player, usages):
 
     return embed
 
-def player_stats(ctx, stats, recent_stats):
+def player_stats(ctx, stats, recent_stats, image_name=None):
     embed = Embed(title=f"{stats.name}'s Stats:", colour=Color.blue())
+    if image_name:
+        # Stats card sent as attachment of the message
+        embed.set_image(url=f"attachment://{image_name}")
     embed.add_field(name="Recent (last 2 weeks)",
                     value=f"Matches played: {recent_stats.nb_matches_played}\n"
                           f"Play time: {'{:.1f}'.format(recent_stats.time_played / 60)} hours\n"
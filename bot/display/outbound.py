@@ -0,0 +1,190 @@
+"""
+| Outbound scheduler for the messages sent and edited by the bot.
+| Each channel has its own queue, served by a single worker: the messages of a channel are sent one at a time.
+  New messages are always sent in order. Edits are sent before or after them according to their priority
+  (:data:`HIGH` for match-critical messages, :data:`LOW` for informational messages).
+| An edit of a message which is still waiting in the queue is merged into the pending edit instead of being
+  queued again, so superseded edits are never sent.
+| Interaction responses don't go through the scheduler as they must be answered immediately.
+"""
+
+from asyncio import get_event_loop
+from collections import deque
+from heapq import heappush, heappop
+from itertools import count
+from logging import getLogger
+from time import time
+
+from discord import File
+
+from lib.tasks import Loop
+
+log = getLogger("pog_bot")
+
+# Priorities, lowest value is sent first
+HIGH = 0
+NORMAL = 1
+LOW = 2
+
+# Log a warning when a message waited longer than this in its queue (in seconds)
+QUEUE_WARNING = 5
+
+# Queues by channel id
+_queues = dict()
+# Pending edits by (channel id, message id)
+_edits = dict()
+# Channels with a running worker
+_workers = set()
+_counter = count()
+
+_stats = {
+    "sent": 0,
+    "coalesced": 0,
+    "retries": 0,
+    "rate_limited": 0,
+    "max_depth": 0,
+    "max_wait": 0.0
+}
+
+
+class _Pending:
+    def __init__(self, ctx, command, kwargs, priority, key):
+        self.ctx = ctx
+        self.command = command
+        self.kwargs = kwargs
+        self.priority = priority
+        self.key = key
+        self.seq = next(_counter)
+        self.stamp = time()
+        self.futures = list()
+        self.is_sent = False
+
+
+class _ChannelQueue:
+    """
+    Messages waiting to be sent in a channel: new messages in order of arrival, edits in order of priority.
+    """
+    def __init__(self):
+        self.sends = deque()
+        # Heap of (priority, sequence number, pending edit), an edit can have several entries
+        self.edits = list()
+
+    def __len__(self):
+        return len(self.sends) + len(self.edits)
+
+    def push(self, item):
+        if item.command == "edit":
+            heappush(self.edits, (item.priority, next(_counter), item))
+        else:
+            self.sends.append(item)
+
+    def pop(self):
+        if self.sends:
+            # The first message must be sent before any other: it gets the best priority of the queued messages
+            send_rank = (min(item.priority for item in self.sends), self.sends[0].seq)
+            if not self.edits or send_rank <= self.edits[0][:2]:
+                return self.sends.popleft()
+        return heappop(self.edits)[2]
+
+
+def _merge(item, kwargs):
+    # Files of a superseded edit won't be sent, close them
+    old_files = [item.kwargs.get("file")] if "file" in kwargs else list()
+    if "attachments" in kwargs:
+        old_files += item.kwargs.get("attachments", list())
+    new_files = [kwargs.get("file"), *kwargs.get("attachments", list())]
+    for file in old_files:
+        if isinstance(file, File) and not any(file is new for new in new_files):
+            file.close()
+    item.kwargs.update(kwargs)
+
+
+async def submit(ctx, command: str, kwargs: dict, priority: int = NORMAL):
+    """
+    Queue a message to be sent or edited, and wait until it is done.
+
+    :param ctx: ContextWrapper to use.
+    :param command: "send" or "edit".
+    :param kwargs: Message elements.
+    :param priority: Priority of the message, :data:`HIGH`, :data:`NORMAL` or :data:`LOW`.
+    :return: The message sent or edited.
+    :raise: Any exception raised when sending the message.
+    """
+    ch_id = ctx.channel_id
+    future = get_event_loop().create_future()
+    key = None
+    if command == "edit":
+        msg_id = getattr(ctx.original_ctx, "id", None)
+        if msg_id:
+            key = (ch_id, msg_id)
+
+    item = _edits.get(key) if key else None
+    if item:
+        # Edit superseded before being sent: only the merged edit is sent
+        _merge(item, kwargs)
+        _stats["coalesced"] += 1
+        if priority < item.priority:
+            item.priority = priority
+            _queues[ch_id].push(item)
+    else:
+        item = _Pending(ctx, command, kwargs, priority, key)
+        queue = _queues.setdefault(ch_id, _ChannelQueue())
+        queue.push(item)
+        if key:
+            _edits[key] = item
+        _stats["max_depth"] = max(_stats["max_depth"], len(queue))
+        if ch_id not in _workers:
+            _workers.add(ch_id)
+            Loop(coro=_worker, count=1).start(ch_id)
+    item.futures.append(future)
+    return await future
+
+
+async def _worker(ch_id):
+    queue = _queues[ch_id]
+    try:
+        while queue:
+            item = queue.pop()
+            # Already sent from a higher priority entry
+            if item.is_sent:
+                continue
+            item.is_sent = True
+            if item.key:
+                _edits.pop(item.key, None)
+            waited = time() - item.stamp
+            _stats["max_wait"] = max(_stats["max_wait"], waited)
+            if waited > QUEUE_WARNING:
+                log.warning(f"Outbound: message waited {waited:.1f}s in queue of channel {ch_id}, "
+                            f"{len(queue)} more waiting")
+            try:
+                msg = await item.ctx._do_send(item.command, item.kwargs)
+            except Exception as e:
+                for future in item.futures:
+                    if not future.done():
+                        future.set_exception(e)
+            else:
+                _stats["sent"] += 1
+                for future in item.futures:
+                    if not future.done():
+                        future.set_result(msg)
+    finally:
+        _workers.discard(ch_id)
+        if not queue:
+            del _queues[ch_id]
+
+
+def record_retry():
+    _stats["retries"] += 1
+
+
+def record_rate_limit():
+    _stats["rate_limited"] += 1
+
+
+def get_stats() -> dict:
+    """
+    :return: Counters of the scheduler, with the current queue depth of each busy channel in "depths".
+    """
+    stats = dict(_stats)
+    stats["depths"] = {ch_id: len(queue) for ch_id, queue in _queues.items()}
+    return stats
@@ -2,6 +2,7 @@ from enum import Enum
 from display import embeds, views
 
 from .classes import Message, ContextWrapper
+from .outbound import HIGH, LOW
 
 class AllStrings(Enum):
     """ List of different message strings available
@@ -35,17 +36,17 @@ class AllStrings(Enum):
     LB_ADDED = Message("You've been added to the queue!", embed=embeds.lobby_list)
     LB_REMOVED = Message("You've been removed from the queue!", embed=embeds.lobby_list)
     LB_NOT_IN = Message("You're not in queue!")
-    LB_QUEUE = Message("Current players in queue:", embed=embeds.lobby_list)
+    LB_QUEUE = Message("Current players in queue:", embed=embeds.lobby_list, priority=LOW)
     LB_FULL = Message("Lobby is already full! Waiting for a match to start...")
     LB_STUCK = Message("Lobby is full, but can't start a new match yet. Please wait...", ping=False)
     LB_STUCK_JOIN = Message("You can't join the lobby, it is already full!")
     LB_MATCH_STARTING = Message("Lobby full, match can start! Join <#{}> for team selection!", ping=False,
-                                embed=embeds.join_ts)
+                                embed=embeds.join_ts, priority=HIGH)
     LB_WARNING = Message("{} you will be timed out of the lobby soon! Use `=reset` to remain in the queue!")
     LB_TOO_LONG = Message("{} was removed from the lobby by timeout!", embed=embeds.lobby_list)
     LB_CLEARED = Message("Lobby has been cleared!", embed=embeds.lobby_list)
     LB_EMPTY = Message("Lobby is already empty!")
-    LB_NOTIFY = Message("{} queue is almost full ({}/{}), join to start a match!")
+    LB_NOTIFY = Message("{} queue is almost full ({}/{}), join to start a match!", priority=LOW)
     LB_GET = Message("Restore the lobby with `=lobby restore {}`")
     LB_SAVE = Message("Lobby status saved, will be restored on next restart!")
     LB_REFRESHED = Message("You have reset your queue timeout!")
@@ -57,7 +58,7 @@ class AllStrings(Enum):
     PK_WRONG_CHANNEL = Message("You are in the wrong channel! Check <#{}> instead")
     PK_NOT_TURN = Message("It's not your turn!")
     PK_NOT_CAPTAIN = Message("You are not Team Captain!")
-    PK_SHOW_TEAMS = Message("Match status:", embed=embeds.team_update)
+    PK_SHOW_TEAMS = Message("Match status:", embed=embeds.team_update, priority=LOW)
     PK_PLAYERS_HELP = Message("Waiting for {} to pick a player with `=p @mention`", ping=False)
     PK_NO_ARG = Message("@ mention a player to pick!")
     PK_TOO_MUCH = Message("You can't pick more than one player at the same time!")
@@ -100,11 +101,11 @@ class AllStrings(Enum):
     API_ERROR = Message("Could not reach Planetside2 API, try again later!")
     API_READY_ERROR = Message("Could not reach Planetside2 API, player online check ignored!", ping=False)
     API_SCORE_ERROR = Message("Match {}, round {}: Could not reach Planetside2 API, no scores for this round!")
-    PUBLISH_ERROR = Message("Match {}, round {}: Could not publish score image, no scores for this round!")
-    GLOBAL_INFO = Message("Here is what's going on in POG at the moment:", embed=embeds.global_info)
+    PUBLISH_RENDER_ERROR = Message("Match {}, round {}: Could not render or upload the score image!")
+    GLOBAL_INFO = Message("Here is what's going on in POG at the moment:", embed=embeds.global_info, priority=LOW)
     CHECK_ACCOUNT = Message("Your account password may have been flipped!\n"
                             "Re-register in <#{}> to confirm you still have access to it!", embed=embeds.flip_accounts)
-    RDY = Message("Bot just started and is now ready. Version `{}`")
+    RDY = Message("Bot just started and is now ready. Version `{}`", priority=LOW)
     RULES = Message("Click below to accept the rules", ping=False)
     STOP = Message("Bot shutting down! Saving state...")
     SPAM_CLEARED = Message("Cleared the spam list!")
@@ -125,6 +126,10 @@ class AllStrings(Enum):
     BOT_IS_LOCKED = Message("Bot is locked!")
     BOT_ALREADY = Message("Already {}!")
     BOT_VERSION = Message("Version `{}`, locked: `{}`")
+    BOT_QUEUES = Message("Outbound messages: `{}` sent, `{}` edits coalesced, `{}` retries, `{}` rate limited, "
+                         "max queue depth `{}`, max wait `{:.1f}s`\nBusy channels: {}")
+    BOT_CMD_QUEUES = Message("Match commands:\n{}", ping=False)
+    BOT_PLUGIN_QUEUES = Message("Match plugins:\n{}", ping=False)
     BOT_FROZEN = Message("Channel frozen!")
     BOT_UNFROZEN = Message("Channel unfrozen!")
     BOT_BP_OFF = Message("Ingame status check is now enabled!")
@@ -150,7 +155,7 @@ class AllStrings(Enum):
     CAP_NOT_OK = Message("Can't make {} a captain!", ping=False)
 
     MATCH_DM_PING = Message("POG match {} is starting! Please join `{}` channel in the Jaeger Events discord!", ping=False)
-    MATCH_INIT = Message("{}\nMatch is ready, starting team selection...")
+    MATCH_INIT = Message("{}\nMatch is ready, starting team selection...", priority=HIGH)
     MATCH_SHOW_PICKS = Message("Captains have been selected, {} choose a player", embed=embeds.team_update, ping=False)
     MATCH_BASE_AUTO = Message("Match will be on **{}**", ping=False)
     MATCH_CONFIRM = Message("{} {} Type `=ready` when your team is inside their sunderer, ready to start",
@@ -158,9 +163,9 @@ class AllStrings(Enum):
     MATCH_TEAM_READY = Message("{} is now ready!", embed=embeds.team_update)
     MATCH_TEAM_UNREADY = Message("{} is no longer ready!", embed=embeds.team_update)
     MATCH_STARTING_1 = Message("Everyone is ready, round {} is starting in {} seconds!\nAll players will be pinged on "
-                               "round start")
-    MATCH_STARTING_2 = Message("Round {} is starting in {} seconds!")
-    MATCH_STARTED = Message("{}\n{}\nRound {} is starting now!")
+                               "round start", priority=HIGH)
+    MATCH_STARTING_2 = Message("Round {} is starting in {} seconds!", priority=HIGH)
+    MATCH_STARTED = Message("{}\n{}\nRound {} is starting now!", priority=HIGH)
     MATCH_NO_MATCH = Message("Can't use command `={}`, no match is happening here!")
     MATCH_NO_COMMAND = Message("Can't use command `={}` now!")
     MATCH_NO_COMMAND_READY = Message("Can't use command `={}: your team is ready!")
@@ -169,10 +174,12 @@ class AllStrings(Enum):
     MATCH_PLAYERS_OFFLINE = Message("Can't get {} ready, {} {} not online in game!", ping=False,
                                     embed=embeds.offline_list)
     MATCH_CLEAR = Message("Clearing match...", ping=False)
-    MATCH_ROUND_OVER = Message("{}\n{}\nRound {} is over!")
-    MATCH_OVER = Message("The match is over!\nClearing...")
+    MATCH_ROUND_OVER = Message("{}\n{}\nRound {} is over!", priority=HIGH)
+    MATCH_OVER = Message("The match is over!\nClearing...", priority=HIGH)
     MATCH_SWAP = Message("Swap sundy placement for the next round!")
     MATCH_CHANNEL_OVER = Message("Locking channel until next match...")
+    MATCH_RESUMED = Message("{}\nBot restarted: match {} was resumed!", ping=False)
+    MATCH_RESUME_STAFF = Message("Match {} in <#{}> was interrupted by a restart, {}.\nAccounts in use: {}", ping=False)
     MATCH_CHECK_CHANGED = Message("{} check is now {}")
 
     BASE_HELP = Message("Here is how to choose a base:", embed=embeds.base_help)
@@ -197,12 +204,13 @@ class AllStrings(Enum):
     ACC_ERROR = Message("Error when giving out Jaeger accounts!\n**Match has been canceled!**")
     ACC_UPDATE = Message(None, ping=False, embed=embeds.account)
     ACC_STAFF = Message("{}, couldn't send the account to {}, please send it manually...", ping=False,
-                        embed=embeds.account)
+                        embed=embeds.accounts)
+    ACC_STAFF_UPDATE = Message(None, ping=False, embed=embeds.accounts)
     ACC_SENT = Message("**Successfully sent all jaeger accounts!**")
     ACC_SENDING = Message("Loading Jaeger accounts...")
     ACC_OVER = Message("Match is over, please log out of your Jaeger account!", ping=False)
-    ACC_CLOSED = Message("{}'s DMS are locked, couldn't send them a Jaeger account after 3 retries!\nSending the "
-                         "account to staff instead.")
+    ACC_CLOSED = Message("DMs of {} are locked, couldn't send them a Jaeger account after 3 retries!\nSending the "
+                         "accounts to staff instead.")
     ACC_LOG = Message("Player [name:{}], [id:{}] will receive {}")
     ACC_GIVING = Message("Sent a Jaeger account for {}!", ping=False)
 
@@ -236,7 +244,7 @@ class AllStrings(Enum):
     MUTE_SHOW = Message("You are muted from POG until {}!")
     MUTE_FREED = Message("You are no longer muted from POG!")
 
-    SC_ILLEGAL_WE = Message("{} used {} during match {}! This weapon is banned! Ignoring {} kill(s)...")
+    SC_ILLEGAL_WE = Message("{} used {} during match {}! This weapon is banned! Ignoring {} kill(s)...", priority=LOW)
     SC_PLAYERS_STRING = Message("Here is player data for squittal script:\n{}\n")
     SC_PLAYERS_STRING_DISC = Message("Here is player data for squittal script:\n{}\n"
                                      "Disclaimer: This info might still change before the match actually starts!")
@@ -249,7 +257,8 @@ class AllStrings(Enum):
     SUB_OKAY_TEAM = Message("{} replaced {} in {}", ping=False, embed=embeds.team_update)
     SUB_OKAY_CAP = Message("{} replaced {} as {}'s captain", ping=False, embed=embeds.team_update)
     SUB_OKAY = Message("{} replaced {}!", ping=False, embed=embeds.team_update)
-    SUB_LOBBY = Message("{} you have been designated as a substitute, join <#{}>!", embed=embeds.lobby_list)
+    SUB_LOBBY = Message("{} you have been designated as a substitute, join <#{}>!", embed=embeds.lobby_list,
+                        priority=HIGH)
     SUB_OK_CONFIRM = Message("Subbing {}! {} accept if you agree!", ping=False)
     SUB_ONLY_ADMIN = Message("Only staff can sub players before captains are selected!")
 
@@ -281,7 +290,7 @@ class AllStrings(Enum):
         if not isinstance(ctx, ContextWrapper):
             ctx = ContextWrapper.wrap(ctx)
         kwargs = self.value.get_elements(ctx, string_args=args, ui_kwargs=kwargs)
-        return await ctx.send(**kwargs)
+        return await ctx.send(priority=self.value.priority, **kwargs)
 
     async def edit(self, msg, *args, **kwargs):
         """
@@ -295,12 +304,36 @@ class AllStrings(Enum):
         if not isinstance(msg, ContextWrapper):
             msg = ContextWrapper.wrap(msg)
         kwargs = self.value.get_elements(msg, string_args=args, ui_kwargs=kwargs)
-        return await msg.edit(**kwargs)
+        return await msg.edit(priority=self.value.priority, **kwargs)
 
-    async def image_send(self, ctx, image_path, *args):
+    async def image_send(self, ctx, image, *args, **kwargs):
+        """
+        Send the message with an image attached.
+
+        :param ctx: context.
+        :param image: Path of the image file, or discord File object.
+        :param args: Additional strings to format the main string with.
+        :param kwargs: Keywords arguments to pass to the embed function.
+        :return: The message sent.
+        """
         if not isinstance(ctx, ContextWrapper):
             ctx = ContextWrapper.wrap(ctx)
-        kwargs = self.value.get_elements(ctx, string_args=args, image_path=image_path)
-        return await ctx.send(**kwargs)
+        kwargs = self.value.get_elements(ctx, string_args=args, ui_kwargs=kwargs, image=image)
+        return await ctx.send(priority=self.value.priority, **kwargs)
+
+    async def image_edit(self, msg, image, *args):
+        """
+        Edit the message, replacing its attachments with an image.
+
+        :param msg: Message to edit.
+        :param image: Path of the image file, or discord File object.
+        :param args: Additional strings to format the main string with.
+        :return: The message edited.
+        """
+        if not isinstance(msg, ContextWrapper):
+            msg = ContextWrapper.wrap(msg)
+        kwargs = self.value.get_elements(msg, string_args=args, image=image)
+        kwargs['attachments'] = [kwargs.pop('file')]
+        return await msg.edit(priority=self.value.priority, **kwargs)
 
 
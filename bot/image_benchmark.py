@@ -0,0 +1,59 @@
+"""
+Benchmark of the match image rendering.
+Compare full renders (template drawn for every image) with template-based renders (template drawn once).
+
+Run from the bot folder: python image_benchmark.py [number of renders]
+"""
+
+from types import SimpleNamespace
+from random import randint, choice, random
+from time import perf_counter
+import sys
+
+import modules.image_maker as i_maker
+
+_LOADOUTS = ["infiltrator", "light_assault", "medic", "engineer", "heavy_assault", "max"]
+
+
+def _fake_player(i):
+    return SimpleNamespace(name=f"Player_{i}_{'x' * randint(0, 20)}", ig_name=f"IgName{i}{'y' * randint(0, 20)}",
+                           score=randint(-10, 100), net=randint(-10, 50), kills=randint(0, 50),
+                           deaths=randint(0, 50), hsr=random(),
+                           main_loadouts=[choice(_LOADOUTS) for _ in range(randint(1, 2))])
+
+
+def _fake_match(m_id, nb_players):
+    teams = list()
+    for t_id in range(2):
+        players = [_fake_player(i) for i in range(nb_players)]
+        teams.append(SimpleNamespace(id=t_id, name=f"Team {t_id + 1}", faction=t_id + 1, score=randint(0, 500),
+                                     net=randint(0, 200), kills=randint(0, 300), deaths=randint(0, 300),
+                                     hsr=random(), cap=randint(0, 100), nb_players=nb_players, players=players))
+    return SimpleNamespace(id=m_id, teams=teams, base_name="Ghanan South Pass",
+                           round_stamps=[1600000000, 1600001000], round_length=10)
+
+
+def _bench(matches, use_template):
+    start = perf_counter()
+    for match in matches:
+        if not use_template:
+            i_maker._make_template.cache_clear()
+        i_maker._draw_image(match)
+    return perf_counter() - start
+
+
+def main(nb_renders=20):
+    matches = [_fake_match(i, 6) for i in range(nb_renders)]
+    # Warm up font and asset caches
+    i_maker._draw_image(matches[0])
+
+    full = _bench(matches, use_template=False)
+    templated = _bench(matches, use_template=True)
+
+    print(f"Full renders:     {nb_renders} images in {full:.2f}s ({full / nb_renders * 1000:.1f} ms/image)")
+    print(f"Template renders: {nb_renders} images in {templated:.2f}s ({templated / nb_renders * 1000:.1f} ms/image)")
+    print(f"Speedup: x{full / templated:.2f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20)
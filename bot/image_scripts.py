@@ -0,0 +1,147 @@
+"""
+Regenerate the score images of past matches, typically after a change of the scoreboard layout or fonts.
+Matches are streamed from the database and rendered in parallel on all cores.
+Images whose match data and rendering code didn't change since the last run are skipped.
+
+Run from the bot folder: python image_scripts.py [--start ID] [--end ID] [--workers N] [--force]
+"""
+
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from time import perf_counter
+from glob import glob
+import argparse
+import hashlib
+import json
+import os
+
+import modules.config as cfg
+import modules.database as db
+import modules.image_maker as i_maker
+import classes.scores
+from classes import Player, Base
+from match.classes import Match
+
+MANIFEST = f"{i_maker.ARCHIVE_FOLDER}/manifest.json"
+
+# Print progress every REPORT_EVERY images
+REPORT_EVERY = 50
+
+
+def _render_fingerprint() -> bytes:
+    """
+    Hash of everything that changes the look of the images: rendering code, fonts, icons and encoding settings.
+    """
+    h = hashlib.sha256()
+    for path in [i_maker.__file__, *sorted(glob("../fonts/*")), *sorted(glob("../media/*.png")), "../logos/bot.png"]:
+        with open(path, "rb") as file:
+            h.update(file.read())
+    h.update(f"{i_maker.IMAGE_FORMAT}/{i_maker.PALETTE_COLORS}/{i_maker.PNG_OPTIMIZE}".encode())
+    return h.digest()
+
+
+def _load_manifest() -> dict:
+    try:
+        with open(MANIFEST, "r") as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return dict()
+
+
+def _save_manifest(manifest: dict):
+    os.makedirs(os.path.dirname(MANIFEST), exist_ok=True)
+    with open(MANIFEST, "w") as file:
+        json.dump(manifest, file)
+
+
+def _get_name(p_id):
+    player = Player.get(p_id)
+    if player:
+        return player.name
+    return "Unknown"
+
+
+def _render_one(snapshot, key):
+    """
+    Render and save one image, this is run in the worker processes.
+    """
+    data, _ = i_maker._make_image(snapshot)
+    i_maker._write_file(f"{i_maker.ARCHIVE_FOLDER}/{i_maker.image_filename(snapshot.id)}", data)
+    return snapshot.id, key
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Regenerate the score images of past matches.")
+    parser.add_argument("--start", type=int, default=None, help="First match id to render (resume point)")
+    parser.add_argument("--end", type=int, default=None, help="Last match id to render")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Number of rendering processes")
+    parser.add_argument("--force", action="store_true", help="Render even if the image didn't change")
+    args = parser.parse_args()
+
+    if os.path.isfile("test"):
+        launch_str = "_test"
+    else:
+        launch_str = ""
+    cfg.get_config(launch_str)
+    db.init(cfg.database)
+    db.get_all_elements(Player.new_from_data, "users")
+    db.get_all_elements(Base, "static_bases")
+    classes.scores.init(_get_name)
+
+    query = dict()
+    if args.start is not None:
+        query["$gte"] = args.start
+    if args.end is not None:
+        query["$lte"] = args.end
+
+    fingerprint = _render_fingerprint()
+    manifest = _load_manifest()
+    pending = set()
+    rendered = skipped = failed = 0
+    start = perf_counter()
+
+    def collect(futures):
+        nonlocal rendered, failed
+        for future in futures:
+            try:
+                m_id, key = future.result()
+            except Exception as e:
+                print(f"Rendering failed: {e}")
+                failed += 1
+                continue
+            manifest[str(m_id)] = key
+            rendered += 1
+            if rendered % REPORT_EVERY == 0:
+                _save_manifest(manifest)
+                elapsed = perf_counter() - start
+                print(f"Rendered {rendered} images (last id: {m_id}), {rendered / elapsed:.2f} images/s")
+
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        for data in db.iterate_elements("matches", {"_id": query} if query else None):
+            try:
+                snapshot = i_maker._snapshot(Match(data=data).data)
+            except (KeyError, AttributeError, TypeError) as e:
+                print(f"Skipping invalid match {data['_id']}: {e!r}")
+                failed += 1
+                continue
+            h = hashlib.sha256(fingerprint)
+            h.update(repr(snapshot).encode())
+            key = h.hexdigest()
+            path = f"{i_maker.ARCHIVE_FOLDER}/{i_maker.image_filename(snapshot.id)}"
+            if not args.force and manifest.get(str(snapshot.id)) == key and os.path.isfile(path):
+                skipped += 1
+                continue
+            # Keep a bounded number of matches in flight
+            if len(pending) >= args.workers * 4:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                collect(done)
+            pending.add(pool.submit(_render_one, snapshot, key))
+        collect(wait(pending).done)
+
+    _save_manifest(manifest)
+    elapsed = perf_counter() - start
+    print(f"Done in {elapsed:.1f}s: {rendered} rendered ({rendered / elapsed:.2f} images/s), "
+          f"{skipped} unchanged, {failed} failed")
+
+
+if __name__ == "__main__":
+    main()
@@ -8,7 +8,7 @@ The application should be launched from this file
 
 # discord.py
 from discord.ext import commands
-from discord import Intents
+from discord import Intents, MemberCacheFlags
 
 # Other modules
 from asyncio import sleep
@@ -18,7 +18,7 @@ import logging, logging.handlers, sys, os
 from time import gmtime
 
 # General Enum and Exceptions
-from modules.tools import UnexpectedError
+from modules.tools import UnexpectedError, timestamp_now
 
 # Display
 from display import AllStrings as disp, views, ContextWrapper, InteractionContext
@@ -33,6 +33,7 @@ import modules.database
 import modules.message_filter
 import modules.accounts_handler
 import modules.signal
+import modules.journal
 import modules.stat_processor
 import modules.interactions
 
@@ -45,6 +46,47 @@ log = logging.getLogger("pog_bot")
 _interactions_handler = modules.interactions.InteractionHandler(None, views.accept_button, disable_after_use=False)
 
 
+async def _restore_journal_state(state):
+    """
+    Restore the lobby and the matches as they were before the bot stopped.
+    """
+    # Journal stamp is the last time the bot was known running (last change or heartbeat)
+    recent = state["stamp"] > timestamp_now() - modules.journal.RESUME_DELAY
+    for ch_id, m_state in state["matches"].items():
+        try:
+            match = Match.get(int(ch_id))
+        except UnexpectedError:
+            # Channel is not a match channel anymore
+            modules.journal.record_match(int(ch_id), None)
+            continue
+        accounts = ", ".join(f"`{a_id}` (<@{p_id}>)" for p_id, a_id in m_state["accounts"].items()) or "none"
+        resumed = await match.resume(m_state) if recent else None
+        if resumed:
+            result = f"it was resumed {resumed}"
+            p_ids = [p_id for tm in m_state["teams"] if tm for p_id in tm["players"]] + m_state["left"]
+            players_ping = " ".join(f"<@{p_id}>" for p_id in p_ids)
+            await disp.MATCH_RESUMED.send(match.channel, players_ping, m_state["id"])
+        else:
+            result = "it could not be resumed"
+            modules.journal.record_match(int(ch_id), None)
+        await disp.MATCH_RESUME_STAFF.send(ContextWrapper.channel(cfg.channels["staff"]), m_state["id"], ch_id,
+                                           result, accounts)
+    for name, ids in state.get("lobbies", dict()).items():
+        lb = modules.lobby.get_lobby_by_name(name)
+        if not lb and name == modules.journal.LEGACY_LOBBY:
+            # Journal written before lobbies had names, it held the main lobby
+            modules.journal.record_lobby(name, list())
+            lb = modules.lobby.get_main_lobby()
+        if not recent or not lb:
+            modules.journal.record_lobby(name, list())
+            continue
+        for p_id in ids:
+            player = Player.get(p_id)
+            if player and not lb.is_lobby_stuck() and player.is_registered and not player.is_lobbied \
+                    and not player.match:
+                lb.add_to_lobby(player)
+
+
 def _add_main_handlers(client):
     """_add_main_handlers, private function
         Parameters
@@ -128,14 +170,9 @@ def _add_main_handlers(client):
     @client.event
     async def on_presence_update(before, after):
         if before.status != after.status:
-            await on_status_update(after)
-
-    # Status update handler (for inactivity)
-    async def on_status_update(user):
-        player = Player.get(user.id)
-        if not player:
-            return
-        await modules.roles.role_update(player)
+            player = Player.get(after.id)
+            if player:
+                modules.roles.on_presence_update(player, before.status, after.status)
 
 
 def _add_init_handlers(client):
@@ -183,29 +220,44 @@ def _add_init_handlers(client):
             ctx = _interactions_handler.get_new_context(channel)
             await disp.RULES.send(ctx)
 
-        # Update all players roles
-        for p in Player.get_all_players_list():
-            await modules.roles.role_update(p)
+        # Update all players roles, in the background so the bot doesn't have to wait for it to be unlocked
+        players = Player.get_all_players_list()
+        for p in players:
+            modules.roles.schedule_timeout_end(p)
+        if not cfg.low_memory:
+            modules.roles.sync_all(players)
         _add_main_handlers(client)
 
-        if not modules.lobby.get_all_names_in_lobby():
-            try:
-                last_lobby = modules.database.get_field("restart_data", 0, "last_lobby")
-            except KeyError:
-                pass
-            else:
-                for p_id in last_lobby:
-                    try:
-                        player = Player.get(int(p_id))
-                        if player and not modules.lobby.is_lobby_stuck() and player.is_registered:
-                            modules.lobby.add_to_lobby(player)
-                    except ValueError:
-                        pass
-                modules.database.set_field("restart_data", 0, {"last_lobby": list()})
-            names = modules.lobby.get_all_names_in_lobby()
+        if not modules.journal.is_loaded():
+            await _restore_journal_state(modules.journal.replay())
+
+        if cfg.low_memory:
+            # Each member would have to be fetched: only the active players are updated, the roles of the others
+            # are updated when they change
+            modules.roles.sync_all([p for p in players if p.is_lobbied or p.match])
+
+        try:
+            last_lobby = modules.database.get_field("restart_data", 0, "last_lobby")
+        except KeyError:
+            last_lobby = dict()
+        # Previous versions only saved the main lobby
+        if isinstance(last_lobby, list):
+            last_lobby = {modules.lobby.get_main_lobby().name: last_lobby}
+        for lb in modules.lobby.get_all_lobbies():
+            if lb.get_all_names_in_lobby():
+                continue
+            for p_id in last_lobby.get(lb.name, list()):
+                try:
+                    player = Player.get(int(p_id))
+                    if player and not lb.is_lobby_stuck() and player.is_registered and not player.is_lobbied:
+                        lb.add_to_lobby(player)
+                except ValueError:
+                    pass
+            names = lb.get_all_names_in_lobby()
             if names:
-                await disp.LB_QUEUE.send(ContextWrapper.channel(cfg.channels["lobby"]),
-                                         names_in_lobby=modules.lobby.get_all_names_in_lobby())
+                await disp.LB_QUEUE.send(lb.channel, names_in_lobby=names, lobby=lb)
+        if last_lobby:
+            modules.database.set_field("restart_data", 0, {"last_lobby": dict()})
         modules.loader.unlock_all(client)
         log.info('Client is ready!')
         await disp.RDY.send(ContextWrapper.channel(cfg.channels["spam"]), cfg.VERSION)
@@ -290,7 +342,8 @@ def main(launch_str=""):
     intents.webhooks = False
     intents.invites = False
     intents.voice_states = False
-    intents.presences = True
+    # Presences are only needed to give the notify role to online members
+    intents.presences = not cfg.low_memory
     intents.messages = True
     # intents.guild_messages Activated by the previous one
     # intents.dm_messages Activated by the previous one
@@ -300,7 +353,12 @@ def main(launch_str=""):
     intents.typing = False
     intents.guild_typing = False
     intents.dm_typing = False
-    client = commands.Bot(command_prefix=cfg.general["command_prefix"], intents=intents)
+    if cfg.low_memory:
+        # Members are fetched on demand by modules.roles instead of being all cached
+        client = commands.Bot(command_prefix=cfg.general["command_prefix"], intents=intents,
+                              member_cache_flags=MemberCacheFlags.none(), chunk_guilds_at_startup=False)
+    else:
+        client = commands.Bot(command_prefix=cfg.general["command_prefix"], intents=intents)
 
     # Remove default help
     client.remove_command('help')
@@ -309,6 +367,7 @@ def main(launch_str=""):
     modules.database.init(cfg.database)
     modules.database.get_all_elements(Player.new_from_data, "users")
     modules.database.get_all_elements(Base, "static_bases")
+    Base.build_search_index()
     modules.database.get_all_elements(Weapon, "static_weapons")
 
     # Get Account sheet from drive
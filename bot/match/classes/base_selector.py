@@ -10,7 +10,7 @@ from .captain_validator import CaptainValidator
 
 from display import AllStrings as disp, ContextWrapper, InteractionContext, views
 
-from modules.jaeger_calendar import get_booked_bases
+import modules.jaeger_calendar as jaeger_calendar
 from modules.roles import is_admin
 import modules.tools as tools
 
@@ -52,7 +52,6 @@ class BaseSelector:
         self.__selection = list()
         self.__match = match
         self.__selected = None
-        self.__booked = list()
         self.__reset_selection()
         self.__validator = CaptainValidator(self.__match)
         self.__base_interaction = CaptainInteractionHandler(self.__match, views.bases_selection,
@@ -65,7 +64,7 @@ class BaseSelector:
     @loop(count=1)
     async def _get_booked_from_calendar(self):
         lp = get_event_loop()
-        await lp.run_in_executor(None, get_booked_bases, Base, self.__booked)
+        await lp.run_in_executor(None, jaeger_calendar.refresh, Base)
 
     def clean(self):
         self.__validator.clean()
@@ -80,10 +79,12 @@ class BaseSelector:
 
     @property
     def is_booked(self):
-        return self.__selected in self.__booked or self.__is_used(self.__selected)
+        if self.__selected is None:
+            return False
+        return self.is_base_booked(self.__selected)
 
     def is_base_booked(self, base):
-        return base in self.__booked or self.__is_used(base)
+        return jaeger_calendar.is_base_booked(base) or self.__is_used(base)
 
     @property
     def bases_list(self):
@@ -104,6 +105,7 @@ class BaseSelector:
             self.__selected = base
             _pog_selected_bases[self.__match.id] = base.id
             self.__match.data.base = base
+            self.__match.journal()
             self.__base_interaction.clean()
             await disp.BASE_ON_SELECT.send(ctx, base.name, base=base, is_booked=self.is_booked)
             if self.__match.status is MatchStatus.IS_BASING:
@@ -123,6 +125,16 @@ class BaseSelector:
                 raise InteractionInvalid("unknown base!")
             await self.__select_base(ctx, captain, base)
 
+    def restore(self, base):
+        """
+        Select again the base of a resumed match.
+
+        :param base: Base selected before the match was interrupted.
+        """
+        self.__selected = base
+        _pog_selected_bases[self.__match.id] = base.id
+        self.__match.data.base = base
+
     async def show_base_status(self, ctx):
         if self.__selected is None:
             if self.__match.status is MatchStatus.IS_BASING:
@@ -164,7 +176,7 @@ class BaseSelector:
 
     async def select_by_name(self, ctx, picker, args):
         arg = " ".join(args)
-        current_list = Base.get_bases_from_name(arg, base_pool=True)
+        current_list = Base.get_bases_from_name(arg, base_pool=True, fuzzy=True)
         if len(current_list) == 0:
             await disp.BASE_NOT_FOUND.send(ctx)
         elif len(current_list) == 1:
@@ -1,9 +1,12 @@
 from logging import getLogger
+from asyncio import Lock
+from contextlib import asynccontextmanager
+from time import time
 
 from lib.tasks import loop
 from display.strings import AllStrings as disp
 
-from classes import Base, Team, TeamScore
+from classes import Base, Team, TeamScore, Player, ActivePlayer
 import modules.database as db
 import modules.roles as roles
 import modules.config as cfg
@@ -11,15 +14,22 @@ import modules.accounts_handler as accounts
 from modules.tools import UnexpectedError
 import modules.lobby as lobby
 import modules.stat_processor as stat_processor
+import modules.journal as journal
+import modules.image_maker as i_maker
+import modules.census as census
+from modules.asynchttp import ApiNotReachable
 
 from match.processes import CaptainSelection, PlayerPicking, FactionPicking, BasePicking, GettingReady, MatchPlaying
 from match.commands import CommandFactory
 from match.match_status import MatchStatus
-from .base_selector import on_match_over
+from .base_selector import on_match_over, BaseSelector
 from match.plugins.manager import PluginManager
 
 log = getLogger("pog_bot")
 
+# Log a warning when a command waited longer than this for the previous commands of its match (in seconds)
+COMMAND_WAIT_WARNING = 5
+
 
 class Match:
     __bound_matches = dict()
@@ -41,8 +51,16 @@ class Match:
         cls._last_match_id = db.get_field("restart_data", 0, "last_match_id")
 
     @classmethod
-    def find_empty(cls):
-        for match in cls.__bound_matches.values():
+    def find_empty(cls, ch_list: list = None):
+        """
+        Find a free match.
+
+        :param ch_list: Ids of the match channels to look into, all of them if None.
+        :return: A free match, None if there is none.
+        """
+        for ch_id, match in cls.__bound_matches.items():
+            if ch_list is not None and ch_id not in ch_list:
+                continue
             if match.status is MatchStatus.IS_FREE:
                 return match
         return None
@@ -138,6 +156,58 @@ class Match:
         self.__objects.on_spin_up(p_list)
         db.set_field("restart_data", 0, {"last_match_id": Match._last_match_id})
 
+    async def resume(self, state: dict):
+        """
+        Resume a match interrupted by a restart, from its journal state.
+
+        :param state: Match state, see :meth:`MatchObjects.get_journal_state`.
+        :return: Where the match was resumed from (for instance "before round 2"), None if it couldn't be resumed.
+        """
+        if not self.__objects:
+            raise AttributeError("Match instance is not bound, no attribute 'resume'")
+        return await self.__objects.on_resume(state)
+
+    def journal(self):
+        if not self.__objects:
+            raise AttributeError("Match instance is not bound, no attribute 'journal'")
+        self.__objects.journal()
+
+    def command_queue(self):
+        """
+        Context manager serializing the commands of this match: the commands of other matches don't wait for it.
+
+        .. code-block:: python
+
+            async with match.command_queue():
+                await match.command.ready(ctx)
+        """
+        if not self.__objects:
+            raise AttributeError("Match instance is not bound, no attribute 'command_queue'")
+        return self.__objects.command_queue()
+
+    @property
+    def command_stats(self):
+        """
+        Commands serialized in this match channel: dict with "commands", "waiting", "max_wait" and "total_wait".
+        """
+        if not self.__objects:
+            raise AttributeError("Match instance is not bound, no attribute 'command_stats'")
+        return self.__objects.command_stats
+
+    @property
+    def version(self):
+        """
+        Version of the match state, incremented on every change displayed in the match status.
+        """
+        if not self.__objects:
+            raise AttributeError("Match instance is not bound, no attribute 'version'")
+        return self.__objects.version
+
+    def bump_version(self):
+        if not self.__objects:
+            raise AttributeError("Match instance is not bound, no attribute 'bump_version'")
+        self.__objects.version += 1
+
     @property
     def command(self):
         if not self.__objects:
@@ -219,17 +289,39 @@ class MatchObjects:
         self.current_process = None
         self.base_selector = None
         self.progress_index = 0
-        self.result_msg = None
         self.check_offline = True
         self.check_validated = True
         self.players_with_account = list()
         self.command_factory = CommandFactory(self)
         self.plugin_manager = None
+        self.version = 0
+        self.command_lock = Lock()
+        self.command_stats = {"commands": 0, "waiting": 0, "max_wait": 0.0, "total_wait": 0.0}
         self.clean_channel.start(display=False)
 
     def delayed_init(self):
         self.plugin_manager = PluginManager(self.proxy)
 
+    @asynccontextmanager
+    async def command_queue(self):
+        stats = self.command_stats
+        stats["waiting"] += 1
+        start = time()
+        try:
+            await self.command_lock.acquire()
+        finally:
+            stats["waiting"] -= 1
+        waited = time() - start
+        stats["commands"] += 1
+        stats["total_wait"] += waited
+        stats["max_wait"] = max(stats["max_wait"], waited)
+        if waited > COMMAND_WAIT_WARNING:
+            log.warning(f"Command waited {waited:.1f}s for the previous commands in match channel {self.channel.id}")
+        try:
+            yield
+        finally:
+            self.command_lock.release()
+
     @property
     def status(self):
         return self.__status
@@ -248,6 +340,7 @@ class MatchObjects:
     @status.setter
     def status(self, value):
         self.__status = value
+        self.version += 1
         if self.__status is not MatchStatus.IS_RUNNING:
             self.command_factory.on_status_update(value)
 
@@ -260,6 +353,7 @@ class MatchObjects:
         else:
             self.current_process = _process_list[self.progress_index](self, *args)
         self.progress_index += 1
+        self.journal()
 
     def start_next_process(self):
         if self.current_process:
@@ -275,6 +369,155 @@ class MatchObjects:
         self.plugin_manager.on_match_launching()
         self.start_next_process()
 
+    def get_journal_state(self) -> dict:
+        """
+        Get the state of the match to record in the journal.
+
+        :return: Dict with the match id, progress index, players of each team (captain first) and their faction,
+            players left to pick, base id, round stamps and accounts given.
+        """
+        teams = list()
+        accounts_given = dict()
+        for tm in self.teams:
+            if tm is None:
+                teams.append(None)
+                continue
+            teams.append({"players": [p.id for p in tm.players], "faction": tm.faction})
+            for p in tm.players:
+                if p.account:
+                    accounts_given[str(p.id)] = p.account.id
+        left = list()
+        if self.current_process and "get_left_players" in self.current_process.attributes:
+            left = [p.id for p in self.current_process.get_left_players()]
+        return {"id": self.data.id,
+                "progress": self.progress_index,
+                "teams": teams,
+                "left": left,
+                "base_id": self.data.base.id if self.data.base else None,
+                "round_stamps": list(self.data.round_stamps),
+                "accounts": accounts_given}
+
+    def journal(self):
+        # All journaled changes are displayed in the match status
+        self.version += 1
+        if self.data.id != 0:
+            journal.record_match(self.channel.id, self.get_journal_state())
+
+    async def on_resume(self, state: dict):
+        # Get back all the players of the match
+        teams = [tm["players"] if tm else list() for tm in state["teams"]]
+        players = dict()
+        for p_id in [*teams[0], *teams[1], *state["left"]]:
+            player = Player.get(p_id)
+            if not player or player.match or player.is_lobbied:
+                log.warning(f"Can't resume match {state['id']}: player {p_id} is not available")
+                return None
+            players[p_id] = player
+        if len(players) == 0:
+            return None
+
+        self.data.id = state["id"]
+        self.data.round_length = cfg.general["round_length"]
+        self.clean_channel.cancel()
+
+        # If teams were not complete, start again from captain selection
+        if state["progress"] < 3 or state["left"]:
+            self.ready_next_process(list(players.values()))
+            self.plugin_manager.on_match_launching()
+            self.start_next_process()
+            return "from captain selection"
+
+        # Else, rebuild the teams
+        for player in players.values():
+            await player.on_match_selected(self.proxy)
+        await roles.modify_match_channel(self.channel, view=True)
+        self.plugin_manager.on_match_launching()
+        for i in range(2):
+            self.teams[i] = Team(i, f"Team {i + 1}", self.proxy)
+            for p_id in teams[i]:
+                self.teams[i].add_player(ActivePlayer, players[p_id])
+            self.plugin_manager.on_captain_selected(i, players[teams[i][0]])
+        self.plugin_manager.on_captains_selected()
+        self.plugin_manager.on_teams_done()
+
+        factions = [tm["faction"] for tm in state["teams"]]
+        base = Base.get(state["base_id"]) if state["base_id"] else None
+        if all(factions):
+            for tm in self.teams:
+                tm.faction = factions[tm.id]
+                self.plugin_manager.on_faction_pick(tm, tm.faction)
+            self.plugin_manager.on_factions_picked(base)
+        if base:
+            self.data.base = base
+            self.plugin_manager.on_base_selected(base)
+        if not all(factions):
+            # Start again from faction picking, the first pick is lost
+            self.__restore_base_selector(base)
+            self.progress_index = _process_list.index(FactionPicking)
+            result = "from faction picking"
+        elif not base:
+            self.__restore_base_selector(base)
+            self.progress_index = _process_list.index(BasePicking)
+            result = "from base picking"
+        else:
+            result = await self.__resume_rounds(state)
+            if not result:
+                await self.clean_all_auto()
+                return None
+
+        self.ready_next_process()
+        self.start_next_process()
+        return result
+
+    def __restore_base_selector(self, base):
+        self.base_selector = BaseSelector(self, base_pool=True)
+        if base:
+            self.base_selector.restore(base)
+
+    async def __resume_rounds(self, state: dict):
+        """
+        Get back the rounds already played and the accounts given, then set the progress to the getting ready
+        process of the next round.
+        """
+        stamps = state["round_stamps"]
+        ready_indexes = [i for i, process in enumerate(_process_list) if process is GettingReady]
+        # Round started when the bot stopped: it is played again
+        interrupted = len(stamps) > 0 and state["progress"] - 1 == ready_indexes[len(stamps) - 1] + 1
+        if interrupted:
+            stamps = stamps[:-1]
+        if len(stamps) >= len(ready_indexes):
+            log.warning(f"Can't resume match {state['id']}: all rounds were played")
+            return None
+
+        if stamps:
+            # Scores of the rounds played are retrieved again from the api
+            self.base_selector = None
+            for tm in self.teams:
+                tm.on_match_starting()
+            for stamp in stamps:
+                try:
+                    await census.process_score(self.data, stamp)
+                except ApiNotReachable as e:
+                    log.error(f"Can't resume match {state['id']}: ApiNotReachable when processing scores: {e.url}")
+                    return None
+                self.data.round_stamps.append(stamp)
+            # Accounts given at the first round are given back
+            for tm in self.teams:
+                for a_player in tm.players:
+                    a_id = state["accounts"].get(str(a_player.id))
+                    if a_id and accounts.restore_account(a_player, a_id):
+                        self.players_with_account.append(a_player)
+            if self.players_with_account:
+                await accounts.send_accounts(self.channel, self.players_with_account)
+        else:
+            self.__restore_base_selector(self.data.base)
+
+        self.progress_index = ready_indexes[len(stamps)]
+        result = f"before round {len(stamps) + 1}"
+        if interrupted:
+            result += f", round {len(stamps) + 1} was interrupted and will be played again"
+        return result
+
     @loop(count=1)
     async def match_over_loop(self):
         await disp.MATCH_OVER.send(self.match.channel)
@@ -312,18 +555,19 @@ class MatchObjects:
     async def clean_async(self):
         await self.plugin_manager.async_clean()
         on_match_over(self.data.id)
+        i_maker.on_match_clean(self.data.id)
         for a_player in self.players_with_account:
             await accounts.terminate_account(a_player)
         self.data.clean()
         self.players_with_account = list()
-        self.result_msg = None
         self.check_offline = True
         self.check_validated = True
         self.clean_channel.change_interval(minutes=2)
         self.clean_channel.start(display=True)
         self.progress_index = 0
         self.status = MatchStatus.IS_FREE
-        lobby.on_match_free()
+        journal.record_match(self.channel.id, None)
+        lobby.on_match_free(self.channel.id)
 
     @loop(count=2, delay=1)
     async def clean_channel(self, display):
@@ -1,8 +1,8 @@
-from display import AllStrings as disp, ContextWrapper
+from display import AllStrings as disp
 import modules.config as cfg
 import discord
 
-from modules.lobby import get_sub, get_all_names_in_lobby
+from modules.lobby import get_match_lobby, get_player_lobby
 from lib.tasks import Loop
 
 from classes import Player
@@ -64,21 +64,23 @@ async def get_substitute(match, subbed, player=None):
     """
     # Get a new player from the lobby, if None available, display
     was_lobbied = (not player) or (player and player.is_lobbied)
-    player = get_sub(player)
+    # A forced player can be lobbied in another lobby than the one of this match
+    lb = get_player_lobby(player) if player and player.is_lobbied else get_match_lobby(match.channel.id)
+    player = lb.get_sub(player)
     if player is None:
         await disp.SUB_NO_PLAYER.send(match.channel, subbed.mention)
         return
 
-    Loop(coro=ping_sub_in_lobby, count=1).start(match, player, was_lobbied)
+    if was_lobbied:
+        Loop(coro=ping_sub_in_lobby, count=1).start(match, player, lb)
 
     await player.on_match_selected(match.proxy)
     return player
 
 
-async def ping_sub_in_lobby(match, new_player, was_lobbied):
-    if was_lobbied:
-        await disp.SUB_LOBBY.send(ContextWrapper.channel(cfg.channels["lobby"]), new_player.mention, match.channel.id,
-                                  names_in_lobby=get_all_names_in_lobby())
+async def ping_sub_in_lobby(match, new_player, lb):
+    await disp.SUB_LOBBY.send(lb.channel, new_player.mention, match.channel.id,
+                              names_in_lobby=lb.get_all_names_in_lobby(), lobby=lb)
     # ctx = ContextWrapper.user(new_player.id)
     # try:
     #     await disp.MATCH_DM_PING.send(ctx, match.id, match.channel.name)
@@ -129,7 +131,7 @@ def get_check_player_sync(ctx, match):
         msg = disp.EXT_NOT_REGISTERED.send(ctx, cfg.channels["register"])
     elif not player.match:
         # if player not in match
-        msg = disp.PK_NO_LOBBIED.send(ctx, cfg.channels["lobby"])
+        msg = disp.PK_NO_LOBBIED.send(ctx, get_match_lobby(match.channel.id).channel_id)
     elif player.match is not match.proxy:
         # if player not in the right match channel
         msg = disp.PK_WRONG_CHANNEL.send(ctx, player.match.channel.id)
@@ -9,6 +9,8 @@ log = getLogger("pog_bot")
 
 
 class SimpleLogger(Plugin):
+    # Events are the match log, none of them can be dropped
+    queue_size = None
 
     def __init__(self, match):
         super().__init__(match)
@@ -38,12 +40,12 @@ class SimpleLogger(Plugin):
         self.data["teams_done"] = timestamp_now()
         self.__event("on_teams_done")
 
-    def on_faction_pick(self, team):
+    def on_faction_pick(self, team, faction):
         self.__auto_dict_add("factions",
-                             {"team": team.id, "timestamp": timestamp_now(), "faction": cfg.factions[team.faction]})
-        self.__event(f"on_faction_pick: team: [{team.id}] picked: [{cfg.factions[team.faction]}]")
+                             {"team": team.id, "timestamp": timestamp_now(), "faction": cfg.factions[faction]})
+        self.__event(f"on_faction_pick: team: [{team.id}] picked: [{cfg.factions[faction]}]")
 
-    def on_factions_picked(self):
+    def on_factions_picked(self, base):
         self.__event("on_factions_picked")
 
     def on_base_selected(self, base):
@@ -53,14 +55,14 @@ class SimpleLogger(Plugin):
     def on_team_ready(self, team):
         self.__event(f"on_team_ready: team: [{team.id}]")
 
-    def on_match_starting(self):
+    def on_match_starting(self, round_no):
         self.__auto_dict_add("rounds",
-                             {"round_number": self.match.round_no, "event": "starting", "timestamp": timestamp_now()})
+                             {"round_number": round_no, "event": "starting", "timestamp": timestamp_now()})
         self.__event("on_match_starting")
 
-    def on_round_over(self):
+    def on_round_over(self, round_no):
         self.__auto_dict_add("rounds",
-                             {"round_number": self.match.round_no, "event": "stopping", "timestamp": timestamp_now()})
+                             {"round_number": round_no, "event": "stopping", "timestamp": timestamp_now()})
         self.__event("on_round_over")
 
     def on_match_over(self):
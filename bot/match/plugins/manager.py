@@ -1,12 +1,37 @@
+"""
+| Dispatch the match events to the plugins.
+| Events are not handled in the match processes: each plugin has its own bounded queue, served by a single
+  worker, so a slow plugin never delays the match and the events are delivered to each plugin in order.
+| When the queue of a plugin is full, an event is dropped according to :attr:`Plugin.drop_policy`, and logged.
+  The queue of the match logger has no limit.
+| Handlers can be regular functions or coroutine functions.
+"""
+
 from .logger import SimpleLogger
 from .ts3_interface import AudioBot
+from .plugin import DROP_NEWEST
+
+from asyncio import Event, wait_for, TimeoutError
+from collections import deque
+from inspect import isawaitable
 from logging import getLogger
+from time import time
+
+from lib.tasks import Loop
 import modules.config as cfg
 
 _plugins = [SimpleLogger, AudioBot]
 
 log = getLogger("pog_bot")
 
+# Log a warning when a handler runs longer than this (in seconds)
+SLOW_HANDLER = 1
+# Maximum time to wait for the plugins to handle their pending events when the match is cleaned (in seconds)
+CLEAN_TIMEOUT = 10
+
+# Counters by plugin name, for all matches
+_stats = dict()
+
 
 class VirtualAttribute:
     def __init__(self, manager, name):
@@ -17,22 +42,98 @@ class VirtualAttribute:
         self.manager.on_event(self.name, *args, **kwargs)
 
 
+class _PluginQueue:
+    """
+    Queue of the events waiting to be handled by a plugin.
+
+    :param plugin: Plugin handling the events.
+    """
+    def __init__(self, plugin):
+        self.plugin = plugin
+        self.name = type(plugin).__name__
+        self.events = deque()
+        self.is_running = False
+        self.idle = Event()
+        self.idle.set()
+        self.stats = _stats.setdefault(self.name, {
+            "delivered": 0,
+            "dropped": 0,
+            "max_depth": 0,
+            "total_latency": 0.0,
+            "max_latency": 0.0
+        })
+
+    def put(self, event, args, kwargs):
+        if self.plugin.queue_size is not None and len(self.events) >= self.plugin.queue_size:
+            self.stats["dropped"] += 1
+            if self.plugin.drop_policy == DROP_NEWEST:
+                log.warning(f"Plugin {self.name}: queue full, dropped event {event}")
+                return
+            dropped = self.events.popleft()
+            log.warning(f"Plugin {self.name}: queue full, dropped event {dropped[0]}")
+        self.events.append((event, args, kwargs, time()))
+        self.stats["max_depth"] = max(self.stats["max_depth"], len(self.events))
+        if not self.is_running:
+            self.is_running = True
+            self.idle.clear()
+            Loop(coro=self.__worker, count=1).start()
+
+    async def __worker(self):
+        try:
+            while self.events:
+                event, args, kwargs, stamp = self.events.popleft()
+                start = time()
+                try:
+                    result = getattr(self.plugin, event)(*args, **kwargs)
+                    if isawaitable(result):
+                        await result
+                except Exception as e:
+                    log.error(f"Error occurred in plugin {self.name} on {event}\n{e}")
+                latency = time() - start
+                self.stats["delivered"] += 1
+                self.stats["total_latency"] += latency
+                self.stats["max_latency"] = max(self.stats["max_latency"], latency)
+                if latency > SLOW_HANDLER:
+                    log.warning(f"Plugin {self.name}: {event} took {latency:.1f}s, "
+                                f"received {start - stamp:.1f}s after being sent")
+        finally:
+            self.is_running = False
+            self.idle.set()
+
+    async def join(self, timeout):
+        """
+        Wait until all the pending events are handled.
+
+        :param timeout: Maximum time to wait (in seconds).
+        :return: False if some events were still pending after the timeout.
+        """
+        try:
+            await wait_for(self.idle.wait(), timeout=timeout)
+            return True
+        except TimeoutError:
+            return False
+
+
 class PluginManager:
     def __init__(self, match):
         self.match = match
         self.plugins = list()
+        self.queues = list()
         if cfg.LAUNCH_STR != "_test":
             for Plug in _plugins:
-                self.plugins.append(Plug(self.match))
+                plugin = Plug(self.match)
+                self.plugins.append(plugin)
+                self.queues.append(_PluginQueue(plugin))
 
     def on_event(self, event, *args, **kwargs):
-        for p in self.plugins:
-            try:
-                getattr(p, event)(*args, **kwargs)
-            except Exception as e:
-                log.error(f"Error occurred in plugin {type(p).__name__}\n{e}")
+        for queue in self.queues:
+            queue.put(event, args, kwargs)
 
     async def async_clean(self):
+        # Pending events are handled before cleaning
+        for queue in self.queues:
+            if not await queue.join(CLEAN_TIMEOUT):
+                log.warning(f"Plugin {queue.name}: {len(queue.events)} events still pending when cleaning")
         for p in self.plugins:
             try:
                 await p.async_clean()
@@ -43,3 +144,9 @@ class PluginManager:
         return VirtualAttribute(self, item)
 
 
+def get_stats() -> dict:
+    """
+    :return: Counters of each plugin ("delivered", "dropped", "max_depth", "total_latency", "max_latency"), by
+        plugin name.
+    """
+    return {name: dict(stats) for name, stats in _stats.items()}
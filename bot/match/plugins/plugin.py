@@ -1,4 +1,19 @@
+# Drop policies, used when the event queue of a plugin is full
+DROP_OLDEST = "oldest"
+DROP_NEWEST = "newest"
+
+
 class Plugin:
+    """
+    Base class of the match plugins.
+    Events are delivered in order by :class:`match.plugins.manager.PluginManager`, after the match moved on:
+    handlers should use their arguments rather than the current match state when it matters.
+    """
+    # Maximum number of events waiting to be handled, None for no limit
+    queue_size = 50
+    # Event dropped when the queue is full
+    drop_policy = DROP_OLDEST
+
     def __init__(self, match):
         self.match = match
 
@@ -14,10 +29,10 @@ class Plugin:
     def on_teams_done(self):
         pass
 
-    def on_faction_pick(self, team):
+    def on_faction_pick(self, team, faction):
         pass
 
-    def on_factions_picked(self):
+    def on_factions_picked(self, base):
         pass
 
     def on_base_selected(self, base):
@@ -29,13 +44,13 @@ class Plugin:
     def on_team_ready(self, team):
         pass
 
-    def on_match_starting(self):
+    def on_match_starting(self, round_no):
         pass
 
     def on_match_started(self):
         pass
 
-    def on_round_over(self):
+    def on_round_over(self, round_no):
         pass
 
     def on_match_over(self):
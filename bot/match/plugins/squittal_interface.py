@@ -1,10 +1,9 @@
-import queue
+from collections import OrderedDict
 
 import modules.config as cfg
-from modules.asynchttp import request_code as http_request, post_request
-from lib.tasks import loop, Loop
+from modules.asynchttp import post_request
+from lib.tasks import Loop
 
-from asyncio import sleep
 from logging import getLogger
 
 from .plugin import Plugin
@@ -15,14 +14,44 @@ _ongoing_match = None
 
 
 class SquittalInterface(Plugin):
+    """
+    Publish the match to the squittal script.
+    Operations are sent in order by a single task, over the persistent http session. An operation still waiting
+    to be sent is replaced by a newer operation on the same endpoint (only the latest teams matter).
+    """
 
     def __init__(self, match):
         super().__init__(match)
         self.num = cfg.channels["matches"].index(match.channel.id) + 1
         self.available = True
-        self.operation_queue = queue.Queue()
+        # Pending operations: endpoint -> data
+        self.operations = OrderedDict()
+        self.is_sending = False
         self.initialized = False
 
+    def __put(self, endpoint, data=None):
+        # Keep the position of a superseded operation, only its data changes
+        self.operations[endpoint] = data
+
+    def __send(self):
+        if not self.is_sending and self.operations:
+            self.is_sending = True
+            Loop(coro=self.__send_all, count=1).start()
+
+    async def __send_all(self):
+        try:
+            while self.operations:
+                endpoint, data = self.operations.popitem(last=False)
+                url = f"{cfg.general['squittal_url']}/api/{endpoint}"
+                try:
+                    code = await post_request(url, data)
+                    if code >= 300:
+                        log.warning(f"Squittal API: Received code {code} on {url}")
+                except Exception as e:
+                    log.warning(f"Squittal API: couldn't post to {url}\n{e}")
+        finally:
+            self.is_sending = False
+
     def on_match_launching(self):
         global _ongoing_match
         if _ongoing_match:
@@ -30,41 +59,33 @@ class SquittalInterface(Plugin):
         else:
             self.available = True
             _ongoing_match = self.match
-            self.operation_queue.put(("clear", None))
-            self.operation_queue.put(("title", f'"Match {self.match.id}"'))
-            self.operation_queue.put(("length", f'"{self.match.round_length * 60}"'))
+            # Operations of a previous match are obsolete
+            self.operations.clear()
+            self.__put("clear")
+            self.__put("title", f'"Match {self.match.id}"')
+            self.__put("length", f'"{self.match.round_length * 60}"')
 
     def on_base_selected(self, base):
         if self.available:
-            self.operation_queue.put(("base", f'"{base.id}"'))
+            self.__put("base", f'"{base.id}"')
             if self.initialized:
-                try:
-                    self.do_all.start()
-                except RuntimeError:
-                    pass
+                self.__send()
 
     def on_teams_updated(self):
         if self.available:
             for tm in self.match.teams:
-                self.operation_queue.put((f"teams/{tm.id+1}", str(tm.players_to_dict).replace("'", '"')))
-            try:
-                self.do_all.start()
-            except RuntimeError:
-                pass
+                # Match may have been cleaned before the event is handled
+                if tm is None:
+                    return
+                self.__put(f"teams/{tm.id+1}", str(tm.players_to_dict).replace("'", '"'))
+            self.__send()
             if not self.initialized:
                 self.initialized = True
 
     def on_match_started(self):
         if self.available:
-            self.operation_queue.put(("start", None))
-            self.do_all.start()
-
-    @loop(count=1)
-    async def do_all(self):
-        while not self.operation_queue.empty():
-            current = self.operation_queue.get()
-            await post_request(f"{cfg.general['squittal_url']}/api/{current[0]}", current[1])
-            await sleep(1)
+            self.__put("start")
+            self.__send()
 
     def on_clean(self):
         self.initialized = False
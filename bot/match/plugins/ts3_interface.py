@@ -1,16 +1,27 @@
 import modules.config as cfg
 from modules.asynchttp import request_code as http_request
-from lib.tasks import loop, Loop
+from lib.tasks import Loop
 
-from asyncio import sleep
+from asyncio import Event, wait_for, TimeoutError
+from heapq import heappush, heappop
+from itertools import count
 from logging import getLogger
+from time import time
 
 from .plugin import Plugin
 
 log = getLogger("pog_bot")
 
+_counter = count()
+
 
 class AudioBot(Plugin):
+    """
+    Play the match audio cues with the TS3AudioBot of the match channel.
+    Cues are queued and played in order by a single task, at their wait offset (in seconds) from the event.
+    Each cue has a key: a new cue replaces the pending cue with the same key, and pending cues made obsolete by
+    the match state are dropped.
+    """
     # (note: thanks to the queue system of the TS3AudioBot, two audio won't
     # conflict)
     # Maybe add some checks between different matches anyways
@@ -19,74 +30,122 @@ class AudioBot(Plugin):
         super().__init__(match)
         self.num = cfg.channels["matches"].index(match.channel.id) + 1
         self.lobby = False
+        self.configured = False
+        # Heap of (play time, sequence number, key)
+        self.heap = list()
+        # Pending cues: key -> (sequence number, audio string, lobby)
+        self.cues = dict()
+        self.wakeup = Event()
+        self.is_playing = False
+
+    def __cue(self, key, string, lobby=False, wait=0):
+        seq = next(_counter)
+        self.cues[key] = (seq, string, lobby)
+        heappush(self.heap, (time() + wait, seq, key))
+        if not self.is_playing:
+            self.is_playing = True
+            self.wakeup.clear()
+            Loop(coro=self.__play_all, count=1).start()
+        else:
+            self.wakeup.set()
+
+    def __drop(self, *keys):
+        # Heap entries become stale and are discarded when they reach the top
+        for key in keys:
+            self.cues.pop(key, None)
+
+    def __is_stale(self, item):
+        _, seq, key = item
+        return key not in self.cues or self.cues[key][0] != seq
+
+    async def __play_all(self):
+        try:
+            while True:
+                while self.heap and self.__is_stale(self.heap[0]):
+                    heappop(self.heap)
+                if not self.heap:
+                    break
+                self.wakeup.clear()
+                delay = self.heap[0][0] - time()
+                if delay > 0:
+                    try:
+                        await wait_for(self.wakeup.wait(), timeout=delay)
+                    except TimeoutError:
+                        pass
+                    # Heap top may have changed, check again
+                    continue
+                _, _, key = heappop(self.heap)
+                _, string, lobby = self.cues.pop(key)
+                await self.__play(string, lobby)
+        finally:
+            self.is_playing = False
+
+    async def __play(self, string, lobby):
+        if not self.configured:
+            self.configured = True
+            await configure(self.num)
+        await self.__lobby(lobby)
+        url = f'{cfg.ts["url"]}/api/bot/template/{self.num}(/xecute(/add/{string}.mp3)(/play))'
+        await _send_url(url)
+
+    async def __lobby(self, bl):
+        if self.lobby == bl:
+            return
+        if bl:
+            self.lobby = True
+            url = f'{cfg.ts["url"]}/api/bot/template/{self.num}(/subscribe/channel/{cfg.ts["lobby_id"]})'
+        else:
+            self.lobby = False
+            url = f'{cfg.ts["url"]}/api/bot/template/{self.num}(/unsubscribe/channel/{cfg.ts["lobby_id"]})'
+        await _send_url(url)
 
     def on_match_launching(self):
-        Loop(coro=configure, count=1).start(self.num)
-        audio_string = f"drop_match_{self.num}_picks"
-        _TaskAudio(self).task_audio.start(audio_string, lobby=True, wait=0)
+        self.configured = False
+        self.__cue("launch", f"drop_match_{self.num}_picks", lobby=True)
 
     def on_captains_selected(self):
-        _TaskAudio(self).task_audio.start("select_teams", lobby=False)
+        self.__cue("phase", "select_teams")
 
     def on_teams_done(self):
-        _TaskAudio(self).task_audio.start("select_factions")
+        self.__cue("phase", "select_factions")
 
-    def on_faction_pick(self, team):
-        audio_string = f"team_{team.id + 1}_{cfg.factions[team.faction]}"
-        _TaskAudio(self).task_audio.start(audio_string)
+    def on_faction_pick(self, team, faction):
+        audio_string = f"team_{team.id + 1}_{cfg.factions[faction]}"
+        self.__cue(f"team_{team.id}_faction", audio_string)
 
-    def on_factions_picked(self):
-        if not self.match.base:
-            _TaskAudio(self).task_audio.start("select_base")
+    def on_factions_picked(self, base):
+        if not base:
+            self.__cue("phase", "select_base")
 
     def on_base_selected(self, base):
-        _TaskAudio(self).task_audio.start("base_selected", wait=0)
-        _TaskAudio(self).task_audio.start(f'base_{cfg.id_to_base[base.id]}', wait=1)
-        _TaskAudio(self).task_audio.start("type_ready", wait=2)
+        self.__cue("phase", "base_selected", wait=0)
+        self.__cue("base", f'base_{cfg.id_to_base[base.id]}', wait=1)
+        self.__cue("ready", "type_ready", wait=2)
 
     def on_team_ready(self, team):
         audio_string = f"team_{team.id + 1}_ready"
-        _TaskAudio(self).task_audio.start(audio_string)
+        self.__cue(f"team_{team.id}_ready", audio_string)
 
-    def on_match_starting(self):
+    def on_match_starting(self, round_no):
+        # Teams are ready, pending ready cues are obsolete
+        self.__drop("ready", "team_0_ready", "team_1_ready")
         # Timing tested
-        _TaskAudio(self).task_audio.start("30s", wait=0)
-        _TaskAudio(self).task_audio.start("10s", wait=20)
-        _TaskAudio(self).task_audio.start("5s", wait=25)
-
-    def on_round_over(self):
-        _TaskAudio(self).task_audio.start("round_over")
-        if self.match.round_no == 1:
-            _TaskAudio(self).task_audio.start("switch_sides", wait=0)
-            _TaskAudio(self).task_audio.start("type_ready", wait=1)
+        self.__cue("countdown_30", "30s", wait=0)
+        self.__cue("countdown_10", "10s", wait=20)
+        self.__cue("countdown_5", "5s", wait=25)
+
+    def on_round_over(self, round_no):
+        # Round may be over before the end of the countdown
+        self.__drop("countdown_30", "countdown_10", "countdown_5")
+        self.__cue("round_over", "round_over")
+        if round_no == 1:
+            self.__cue("phase", "switch_sides", wait=0)
+            self.__cue("ready", "type_ready", wait=1)
 
     def on_clean(self):
         self.lobby = False
-
-
-class _TaskAudio:
-
-    def __init__(self, bot):
-        self.bot = bot
-
-    @loop(count=1)
-    async def task_audio(self, string, lobby=False, wait=-1):
-        if wait >= 0:
-            await sleep(wait)
-        await self.__lobby(lobby)
-        url = f'{cfg.ts["url"]}/api/bot/template/{self.bot.num}(/xecute(/add/{string}.mp3)(/play))'
-        await _send_url(url)
-
-    async def __lobby(self, bl):
-        if self.bot.lobby == bl:
-            return
-        if bl:
-            self.bot.lobby = True
-            url = f'{cfg.ts["url"]}/api/bot/template/{self.bot.num}(/subscribe/channel/{cfg.ts["lobby_id"]})'
-        else:
-            self.bot.lobby = False
-            url = f'{cfg.ts["url"]}/api/bot/template/{self.bot.num}(/unsubscribe/channel/{cfg.ts["lobby_id"]})'
-        await _send_url(url)
+        # Match is over: pending prompts and countdowns are obsolete, the round over cue is still played
+        self.__drop(*[key for key in self.cues if key != "round_over"])
 
 
 async def _send_url(url):
@@ -105,4 +164,3 @@ async def configure(num):
         await _send_url(url)
     except Exception as e:
         log.warning(f"Couldn't configure TS3 bot on {url}\n{e}")
-
@@ -11,8 +11,8 @@ from classes import ActivePlayer, Team
 
 from lib.tasks import loop
 
-import modules.config as cfg
 import modules.roles as roles
+import modules.lobby as lobby
 from modules.tools import UnexpectedError
 import match.classes.interactions as interactions
 
@@ -82,7 +82,8 @@ class CaptainSelection(Process, status=MatchStatus.IS_CAPTAIN):
 
         # Open match channel
         await roles.modify_match_channel(self.match.channel, view=True)
-        await disp.LB_MATCH_STARTING.send(ContextWrapper.channel(cfg.channels["lobby"]), self.match.channel.id)
+        await disp.LB_MATCH_STARTING.send(lobby.get_match_lobby(self.match.channel.id).channel,
+                                          self.match.channel.id)
 
         players_ping = " ".join(p.mention for p in self.players.values())
         await disp.MATCH_INIT.send(self.match.channel, players_ping)
@@ -92,7 +92,7 @@ class FactionPicking(Process, status=MatchStatus.IS_FACTION):
         team.faction = faction
         switch_turn(self.match, team)
 
-        self.match.plugin_manager.on_faction_pick(team)
+        self.match.plugin_manager.on_faction_pick(team, faction)
 
         # If other team didn't pick yet:
         if other.faction == 0:
@@ -104,5 +104,5 @@ class FactionPicking(Process, status=MatchStatus.IS_FACTION):
             self.match.ready_next_process()
             self.interaction_handler.clean()
             await disp.PK_FACTION_OK.send(self.match.channel, team.name, cfg.factions[team.faction])
-            self.match.plugin_manager.on_factions_picked()
+            self.match.plugin_manager.on_factions_picked(self.match.base)
             self.match.start_next_process()
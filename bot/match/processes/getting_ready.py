@@ -60,8 +60,7 @@ class GettingReady(Process, status=MatchStatus.IS_WAITING):
                             return
 
             # Try to send the accounts:
-            for a_player in self.match.players_with_account:
-                await accounts.send_account(self.match.channel, a_player)
+            await accounts.send_accounts(self.match.channel, self.match.players_with_account)
 
             await disp.ACC_SENT.send(self.match.channel)
 
@@ -20,6 +20,9 @@ import modules.image_maker as i_maker
 
 log = getLogger("pog_bot")
 
+# The match status is only edited for the countdown once in this interval (in seconds)
+COUNTDOWN_STEP = 60
+
 
 class MatchPlaying(Process, status=MatchStatus.IS_STARTING):
 
@@ -29,10 +32,12 @@ class MatchPlaying(Process, status=MatchStatus.IS_STARTING):
 
         self.ih = interactions.InteractionHandler(self.match, views.refresh_button, disable_after_use=False)
         self.info_message = None
+        # Match version and countdown step of the status currently displayed
+        self.info_key = None
 
         @self.ih.callback('refresh')
         async def refresh(player, interaction_id, interaction, interaction_values):
-            await disp.PK_SHOW_TEAMS.edit(self.info_message, match=self.match.proxy)
+            await self.refresh_info(force=True)
 
         super().__init__(match)
 
@@ -46,7 +51,7 @@ class MatchPlaying(Process, status=MatchStatus.IS_STARTING):
 
     @loop(count=1)
     async def start_match_loop(self):
-        self.match.plugin_manager.on_match_starting()
+        self.match.plugin_manager.on_match_starting(self.match.round_no)
         await disp.MATCH_STARTING_1.send(self.match.channel, self.match.round_no, "30")
         await sleep(10)
         await disp.MATCH_STARTING_2.send(self.match.channel, self.match.round_no, "20")
@@ -57,6 +62,7 @@ class MatchPlaying(Process, status=MatchStatus.IS_STARTING):
         await disp.MATCH_STARTED.send(self.match.channel, *player_pings, self.match.round_no)
         self.match.plugin_manager.on_match_started()
         self.match.round_stamps.append(tools.timestamp_now())
+        self.match.journal()
         super().change_status(MatchStatus.IS_PLAYING)
         self.match_loop.start()
         self.auto_info_loop.start()
@@ -65,13 +71,31 @@ class MatchPlaying(Process, status=MatchStatus.IS_STARTING):
     @Process.public
     async def info(self, ctx=None):
         ctx = self.ih.get_new_context(self.match.channel)
+        self.info_key = self.get_info_key()
         msg = await disp.PK_SHOW_TEAMS.send(ctx, match=self.match.proxy)
         self.info_message = msg
 
+    def get_info_key(self):
+        if not self.match_loop.is_running():
+            return self.match.version, None
+        return self.match.version, self.get_seconds_to_round_end() // COUNTDOWN_STEP
+
+    async def refresh_info(self, force=False):
+        """
+        Edit the match status message if the match changed, or if the countdown moved to the next step.
+
+        :param force: Edit the message even if nothing changed.
+        """
+        key = self.get_info_key()
+        if not force and key == self.info_key:
+            return
+        self.info_key = key
+        await disp.PK_SHOW_TEAMS.edit(self.info_message, match=self.match.proxy)
+
     @loop(seconds=15)
     async def auto_info_loop(self):
         if self.info_message:
-            await disp.PK_SHOW_TEAMS.edit(self.info_message, match=self.match.proxy)
+            await self.refresh_info()
         else:
             await self.info()
 
@@ -88,18 +112,14 @@ class MatchPlaying(Process, status=MatchStatus.IS_STARTING):
         player_pings = [" ".join(tm.all_pings) for tm in self.match.teams]
         self.auto_info_loop.cancel()
         self.ih.clean()
-        self.match.plugin_manager.on_round_over()
         round_no = self.match.round_no
+        self.match.plugin_manager.on_round_over(round_no)
         self.match.ready_next_process()
         await disp.MATCH_ROUND_OVER.send(self.match.channel, *player_pings, round_no)
         try:
             await census.process_score(self.match.data, self.match.last_start_stamp, self.match.channel)
-            try:
-                await i_maker.publish_match_image(self.match)
-            except Exception as e:
-                # Should not happen
-                log.error(f"Error in publish_match_image : {e}")
-                await disp.PUBLISH_ERROR.send(ContextWrapper.channel(cfg.channels["results"]), self.match.id, round_no)
+            # Published in the background, the next process doesn't need to wait for it
+            i_maker.publish_match_image(self.match)
         except ApiNotReachable as e:
             log.error(f"ApiNotReachable caught when processing scores : {e.url}")
             await disp.API_SCORE_ERROR.send(ContextWrapper.channel(cfg.channels["results"]), self.match.id, round_no)
@@ -117,7 +137,7 @@ class MatchPlaying(Process, status=MatchStatus.IS_STARTING):
         self.ih.clean()
         player_pings = [" ".join(tm.all_pings) for tm in self.match.teams]
         self.match.clean_critical()
-        self.match.plugin_manager.on_round_over()
+        self.match.plugin_manager.on_round_over(self.match.round_no)
         await disp.MATCH_ROUND_OVER.send(self.match.channel, *player_pings, self.match.round_no)
         await disp.MATCH_OVER.send(self.match.channel)
         await self.match.clean_async()
@@ -1,12 +1,16 @@
 """
 | This module handle the POG Jaeger accounts.
 | Initialize or reload the module with :meth:`init`.
-| Then call :meth:`give_account` and :meth:`send_account` to hand an account to an in-match player.
+| Then call :meth:`give_account` and :meth:`send_accounts` (or :meth:`send_account`) to hand an account to
+  in-match players. Accounts are sent concurrently, at most :data:`DELIVERY_CONCURRENCY` DMs at a time. The
+  accounts which couldn't be sent are forwarded to staff in as few messages as possible.
 | Use :meth:`terminate_account` to remove the account from the player.
 """
 
 # External imports
 from logging import getLogger
+from asyncio import Semaphore, gather
+from time import time
 from gspread import service_account
 from numpy import array
 import discord.errors
@@ -25,6 +29,16 @@ log = getLogger("pog_bot")
 _busy_accounts = dict()
 _available_accounts = dict()
 
+# Number of account DMs sent at the same time
+DELIVERY_CONCURRENCY = 5
+# Number of tries before giving up on a DM
+DELIVERY_TRIES = 3
+# Maximum number of accounts in one staff message (Discord allows 10 embeds per message)
+STAFF_BATCH_SIZE = 10
+
+# Accounts of each staff message, by message id
+_staff_batches = dict()
+
 # Offsets in the google sheet
 X_OFFSET = 1
 Y_OFFSET = 2
@@ -122,6 +136,21 @@ async def give_account(a_player: classes.ActivePlayer) -> bool:
     return True
 
 
+def restore_account(a_player: classes.ActivePlayer, acc_id: int) -> bool:
+    """
+    Give back to a_player the account they had, used when resuming a match.
+
+    :param a_player: Player to give account to.
+    :param acc_id: Id of the account.
+    :return: True is account given, False if this account is not available.
+    """
+    acc = _available_accounts.get(acc_id)
+    if not acc:
+        return False
+    _set_account(acc, a_player)
+    return True
+
+
 def _set_account(acc: classes.Account, a_player: classes.ActivePlayer):
     """
     Set player's account.
@@ -139,6 +168,85 @@ def _set_account(acc: classes.Account, a_player: classes.ActivePlayer):
     acc.a_player = a_player
     acc.add_usage(a_player.id, a_player.match.id)
     a_player.account = acc
+    a_player.match.journal()
+
+
+async def _deliver(a_player: classes.ActivePlayer, semaphore: Semaphore):
+    """
+    Try to send its account to the player in DM.
+
+    :param a_player: Player to send the account to.
+    :param semaphore: Semaphore limiting the number of DMs sent at the same time.
+    :return: The message sent, None if the account couldn't be delivered.
+    """
+    async with semaphore:
+        start = time()
+        ctx = a_player.account.get_new_context(ContextWrapper.user(a_player.id))
+        for j in range(DELIVERY_TRIES):
+            try:
+                msg = await disp.ACC_UPDATE.send(ctx, account=a_player.account)
+            except discord.errors.Forbidden:
+                continue
+            except Exception as e:
+                # Any other error must not abort the other deliveries: the account goes to the staff fallback
+                log.warning(f"Error when sending account [{a_player.account.id}] to player [{a_player.id}]\n{e}")
+                continue
+            log.info(f"Account [{a_player.account.id}] sent to player [{a_player.id}] in {time() - start:.2f}s "
+                     f"({j + 1} tries)")
+            return msg
+        log.info(f"Couldn't send account [{a_player.account.id}] to player [{a_player.id}] after "
+                 f"{time() - start:.2f}s")
+        return None
+
+
+async def send_accounts(channel: discord.TextChannel, a_players: list):
+    """
+    Actually send their accounts to the players.
+    The DMs are sent concurrently. Accounts of the players with closed DMs are validated and sent to staff
+    in messages of at most :data:`STAFF_BATCH_SIZE` accounts.
+
+    :param channel: Current match channel.
+    :param a_players: Players to send the accounts to.
+    """
+    semaphore = Semaphore(DELIVERY_CONCURRENCY)
+    start = time()
+    messages = await gather(*[_deliver(a_player, semaphore) for a_player in a_players])
+
+    failed = list()
+    for a_player, msg in zip(a_players, messages):
+        if msg:
+            # Set the account message
+            a_player.account.message = msg
+        else:
+            failed.append(a_player)
+    log.info(f"Sent {len(a_players) - len(failed)}/{len(a_players)} accounts in {time() - start:.2f}s")
+
+    if failed:
+        # Validate the accounts and send them to staff channel instead
+        mentions = ", ".join(a_player.mention for a_player in failed)
+        await disp.ACC_CLOSED.send(channel, mentions)
+        for a_player in failed:
+            await a_player.account.validate()
+        # Discord limits the number of embeds per message
+        for i in range(0, len(failed), STAFF_BATCH_SIZE):
+            b_players = failed[i:i + STAFF_BATCH_SIZE]
+            batch = [a_player.account for a_player in b_players]
+            try:
+                msg = await disp.ACC_STAFF.send(ContextWrapper.channel(cfg.channels["staff"]),
+                                                f'<@&{cfg.roles["admin"]}>',
+                                                ", ".join(a_player.mention for a_player in b_players),
+                                                accounts=batch)
+            except Exception as e:
+                log.error(f"Couldn't send accounts {[acc.id for acc in batch]} to staff\n{e}")
+                continue
+            _staff_batches[msg.id] = batch
+            for acc in batch:
+                acc.message = msg
+
+    # Log the accounts:
+    for a_player in a_players:
+        await disp.ACC_LOG.send(ContextWrapper.channel(cfg.channels["spam"]), a_player.name, a_player.id,
+                                a_player.account.id)
 
 
 async def send_account(channel: discord.TextChannel, a_player: classes.ActivePlayer):
@@ -148,24 +256,24 @@ async def send_account(channel: discord.TextChannel, a_player: classes.ActivePla
     :param channel: Current match channel.
     :param a_player: Player to send the account to.
     """
-    msg = None
-    # Try 3 times to send a DM:
-    ctx = a_player.account.get_new_context(ContextWrapper.user(a_player.id))
-    for j in range(3):
-        try:
-            msg = await disp.ACC_UPDATE.send(ctx, account=a_player.account)
-            break
-        except discord.errors.Forbidden:
-            pass
-    if not msg:
-        # Else validate the account and send it to staff channel instead
-        await disp.ACC_CLOSED.send(channel, a_player.mention)
-        await a_player.account.validate()
-        msg = await disp.ACC_STAFF.send(ContextWrapper.channel(cfg.channels["staff"]),
-                                        f'<@&{cfg.roles["admin"]}>', a_player.mention, account=a_player.account)
-    # Set the account message, log the account:
-    a_player.account.message = msg
-    await disp.ACC_LOG.send(ContextWrapper.channel(cfg.channels["spam"]), a_player.name, a_player.id, a_player.account.id)
+    await send_accounts(channel, [a_player])
+
+
+async def _update_terminated(acc: classes.Account):
+    """
+    Remove the reaction handler and update the message of a terminated account.
+
+    :param acc: Terminated account.
+    """
+    batch = _staff_batches.get(acc.message.id)
+    if batch:
+        batch.remove(acc)
+    if batch:
+        # Staff message still holding other accounts: only keep these
+        await disp.ACC_STAFF_UPDATE.edit(acc.message, accounts=batch)
+    else:
+        _staff_batches.pop(acc.message.id, None)
+        await disp.ACC_UPDATE.edit(acc.message, account=acc)
 
 
 async def terminate_account(a_player: classes.ActivePlayer):
@@ -178,11 +286,14 @@ async def terminate_account(a_player: classes.ActivePlayer):
     acc = a_player.account
     acc.terminate()
 
-    # Remove the reaction handler and update the account message
-    await disp.ACC_UPDATE.edit(acc.message, account=acc)
+    # Account was never delivered, no message to update
+    if not acc.message:
+        log.warning(f"Terminating account [{acc.id}] without message")
+    else:
+        await _update_terminated(acc)
 
     # If account was validated, ask the player to log off:
-    if acc.is_validated and acc.message.channel.id != cfg.channels["staff"]:
+    if acc.is_validated and acc.message and acc.message.channel.id != cfg.channels["staff"]:
         await disp.ACC_OVER.send(ContextWrapper.user(acc.a_player.id))
 
     # If account was validated, update the db with usage
@@ -2,6 +2,9 @@
 | Handle asynchronous http requests.
 | Request to PS2 api: use :meth:`api_request_and_retry`.
 | Standard HTTP request: use :meth:`request_code`.
+| POST request: use :meth:`post_request`.
+| :meth:`request_code` and :meth:`post_request` share a persistent session (see :meth:`get_session`), so
+  consecutive calls to the same host reuse the same connection.
 """
 
 # External imports
@@ -19,6 +22,9 @@ from modules.tools import UnexpectedError
 
 log = getLogger("pog_bot")
 
+# Persistent session, created on first use
+_session = None
+
 
 class ApiNotReachable(Exception):
     """
@@ -33,6 +39,20 @@ class ApiNotReachable(Exception):
         super().__init__(message)
 
 
+def get_session() -> ClientSession:
+    """
+    Get the persistent session, create it if needed.
+    Must be called from a coroutine.
+
+    :return: The session.
+    """
+    global _session
+    if _session is None or _session.closed:
+        ssl = cfg.LAUNCH_STR != "_test"
+        _session = ClientSession(connector=TCPConnector(verify_ssl=ssl))
+    return _session
+
+
 async def request_code(url: str) -> int:
     """
     Get the url requested.
@@ -40,21 +60,24 @@ async def request_code(url: str) -> int:
     :param url: URL to get.
     :return: HTTP code returned.
     """
-    async with ClientSession() as client:
-        result = await _fetch_code(client, url)
-        return result
+    return await _fetch_code(get_session(), url)
 
 
-async def post_request(url, data=None):
-    # async with ClientSession(connector=TCPConnector(verify_ssl=False)) as client:
-    ssl = cfg.LAUNCH_STR != "_test"
-    async with ClientSession(connector=TCPConnector(verify_ssl=ssl)) as client:
-        if data:
-            kwargs = {"data": f'{data}', "headers": {'content-type': 'application/json'}}
-        else:
-            kwargs = dict()
-        async with client.post(url, **kwargs) as response:
-            log.debug(f"POST call at {url} returned: {response}")
+async def post_request(url: str, data=None) -> int:
+    """
+    Post data to the url requested.
+
+    :param url: URL to post to.
+    :param data: (Optional) Json data to post, as a string.
+    :return: HTTP code returned.
+    """
+    if data:
+        kwargs = {"data": f'{data}', "headers": {'content-type': 'application/json'}}
+    else:
+        kwargs = dict()
+    async with get_session().post(url, **kwargs) as response:
+        log.debug(f"POST call at {url} returned: {response}")
+        return response.status
 
 
 async def api_request_and_retry(url: str, retries: int = 3) -> dict:
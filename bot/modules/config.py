@@ -107,6 +107,10 @@ LAUNCH_STR = ""
 
 GAPI_JSON = ""
 
+#: Low-memory mode: the bot doesn't receive the members presences and doesn't cache the members.
+#: Optional "low_memory" field in the "General" section.
+low_memory = False
+
 #: Contains general parameters.
 general = {
     "token": "",
@@ -141,6 +145,10 @@ channels = {
 #: Contains all channels the bot should read/interact in.
 channels_list = list()
 
+#: Contains the lobbies, by name: dict with "channel" (lobby channel id), "size" (players needed to start a match)
+#: and "matches" (ids of the match channels used by the lobby). Defaults to a single lobby named "lobby".
+lobbies = dict()
+
 #: Contains discord roles IDs.
 roles = {
     "admin": 0,
@@ -227,6 +235,12 @@ def get_config(launch_str: str):
         except ValueError:
             _error_incorrect(key, 'General', file)
 
+    global low_memory
+    try:
+        low_memory = config['General'].getboolean('low_memory', fallback=False)
+    except ValueError:
+        _error_incorrect('low_memory', 'General', file)
+
     # Testing api key
     # skip_api_test = True
     # if not skip_api_test:
@@ -279,6 +293,29 @@ def get_config(launch_str: str):
         except ValueError:
             _error_incorrect(key, 'Channels', file)
 
+    # Lobbies section (optional)
+    lobbies.clear()
+    if "Lobbies" in config:
+        used_matches = list()
+        for key in config['Lobbies'].keys():
+            try:
+                l_ch, l_size, l_matches = config['Lobbies'][key].split('/')
+                lb = {"channel": int(l_ch), "size": int(l_size), "matches": [int(m) for m in l_matches.split(',')]}
+            except ValueError:
+                _error_incorrect(key, 'Lobbies', file)
+            for m in lb["matches"]:
+                if m not in channels["matches"] or m in used_matches:
+                    _error_incorrect(key, 'Lobbies', file)
+                used_matches.append(m)
+            if lb["channel"] not in channels_list:
+                channels_list.append(lb["channel"])
+            lobbies[key] = lb
+        if not lobbies:
+            raise ConfigError(f"Section 'Lobbies' is empty in '{file}'")
+    else:
+        lobbies["lobby"] = {"channel": channels["lobby"], "size": general["lobby_size"],
+                            "matches": list(channels["matches"])}
+
     # Roles section
     _check_section(config, "Roles", file)
     for key in roles:
@@ -55,6 +55,18 @@ def get_all_elements(init_class_method: Callable, collection: str):
         raise DatabaseError(f"KeyError when retrieving {collection} from database: {e}")
 
 
+def iterate_elements(collection: str, query: dict = None):
+    """
+    Iterate over the elements of a collection, sorted by id.
+    Elements are streamed from the database instead of being loaded all at once.
+
+    :param collection: Collection name.
+    :param query: (Optional) Query filtering the elements.
+    :return: Cursor over the elements found.
+    """
+    return _collections[collection].find(query or dict()).sort("_id")
+
+
 async def async_db_call(call: Callable, *args):
     """
     Call a db function asynchronously.
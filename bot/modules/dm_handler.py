@@ -1,3 +1,5 @@
+from discord import File
+from io import BytesIO
 from classes import Player, PlayerStat
 from match.classes import Match
 import modules.config as cfg
@@ -5,6 +7,7 @@ from display import AllStrings as disp, ContextWrapper
 from logging import getLogger
 import modules.stat_processor as stat_processor
 import modules.spam_checker as spam_checker
+import modules.image_maker as i_maker
 
 log = getLogger("pog_bot")
 
@@ -36,4 +39,15 @@ async def on_stats(user):
     log.info(f"Stats request from player id: [{player.id}], name: [{player.name}]")
     stat_player = await PlayerStat.get_from_database(player.id, player.name)
     recent_stats = await stat_processor.get_new_stats(Match, stat_player)
-    await disp.DISPLAY_STATS.send(user, stats=stat_player, recent_stats=recent_stats)
+    try:
+        key = i_maker.stats_card_key(stat_player, stat_processor.get_recent_matches(stat_player))
+        data = i_maker.get_stats_card(key)
+        if data is None:
+            data = await i_maker.render_stats_card(key, stat_player, recent_stats)
+    except Exception as e:
+        log.error(f"Could not render stats card of player {player.id}: {e}")
+        await disp.DISPLAY_STATS.send(user, stats=stat_player, recent_stats=recent_stats)
+        return
+    filename = i_maker.stats_card_filename(player.id)
+    await disp.DISPLAY_STATS.image_send(user, File(BytesIO(data), filename=filename),
+                                        stats=stat_player, recent_stats=recent_stats, image_name=filename)
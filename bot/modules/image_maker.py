@@ -1,19 +1,68 @@
 """
-This module handle the creation of score images
+| This module handle the creation of score images and player stats cards.
+| Images are rendered in a dedicated process pool, see :meth:`render_match_image` and :meth:`render_stats_card`.
 """
 
 # External imports
 import discord
 from PIL import Image, ImageDraw, ImageFont
 from asyncio import get_event_loop
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import get_context
 from datetime import datetime as dt
+from functools import lru_cache
+from collections import OrderedDict
+from types import SimpleNamespace
+from io import BytesIO
+from logging import getLogger
+from time import perf_counter
+from math import sqrt
+from typing import TYPE_CHECKING
 import os
 
 # Internal imports
 from display.strings import AllStrings as display
 from display.classes import ContextWrapper
+from lib.tasks import Loop
 import modules.config as cfg
 
+if TYPE_CHECKING:
+    from classes import PlayerStat
+    from match.classes.match import Match, MatchData
+
+log = getLogger("pog_bot")
+
+# Number of processes used for rendering
+RENDER_WORKERS = 2
+
+# Folder where the match images are archived
+ARCHIVE_FOLDER = "../../POG-data/matches"
+
+# Also save the match images on disk
+ARCHIVE_IMAGES = True
+
+# Encoding of the match images: "png" (palette PNG) or "webp" (lossless WebP)
+IMAGE_FORMAT = "png"
+# Number of colors of the palette PNG, the images only use a few colors plus anti-aliasing
+PALETTE_COLORS = 256
+# Spend more time compressing the PNG for a slightly smaller file
+PNG_OPTIMIZE = False
+
+# If True, publish a downscaled preview instead of the full resolution image
+PUBLISH_PREVIEW = False
+# Maximum number of pixels of a preview image
+PREVIEW_MAX_PIXELS = 4000000
+# Minimum scale of a preview image, to keep the text legible
+PREVIEW_MIN_SCALE = 0.5
+
+# Number of encoded stats cards kept in memory
+STATS_CACHE_SIZE = 64
+# Number of recent matches shown in the score trend of the stats cards
+TREND_LENGTH = 20
+
+_pool = None
+
 # Fonts we will use
 big_font = ImageFont.truetype("../fonts/OpenSans2.ttf", 100)
 font = ImageFont.truetype("../fonts/OpenSans2.ttf", 80)
@@ -27,6 +76,7 @@ grey2 = (178, 178, 178)
 yellow_light = (254, 244, 186)
 
 # Constant spacings we will use
+IMAGE_WIDTH = 4000
 Y_SPACING = 120
 Y_BIG_SPACE = 150
 X_OFFSET = 100
@@ -54,10 +104,39 @@ def _draw_score_line(draw: ImageDraw.ImageDraw, x_start: int, y: int, values: li
         off += offsets[i]
 
 
+@lru_cache(maxsize=None)
+def _get_asset(path: str, size: tuple) -> Image:
+    """
+    Load an image and resize it. Results are cached: each asset is only loaded once.
+    The returned image is shared and must not be modified.
+
+    :param path: Path of the image file.
+    :param size: Tuple: size (in pixels) of the returned image.
+    :return: The resized image.
+    """
+    with Image.open(path) as asset:
+        asset = asset.convert("RGBA")
+    return asset.resize(size)
+
+
+@lru_cache(maxsize=1024)
+def _text_width(text: str, d_font: ImageFont) -> int:
+    """
+    Get the width of a text string, in pixels. Results are cached.
+
+    :param text: Text to measure.
+    :param d_font: Font for drawing the text.
+    :return: Width of the text.
+    """
+    return d_font.getsize(text)[0]
+
+
+@lru_cache(maxsize=1024)
 def _cut_off_string(text: str, d_font: ImageFont, threshold: int) -> str:
     """
     Cut a text string depending on a maximum length:
     If the text length is more than the threshold, the text will be cut.
+    Results are cached, as the same names appear on every image.
 
     Example: "MyVeryLongName" will become "MyVeryL...", while "ShorterName" will not be changed.
 
@@ -68,48 +147,87 @@ def _cut_off_string(text: str, d_font: ImageFont, threshold: int) -> str:
     :param threshold: The text returned length will not be more than this threshold.
     :return: The cut text if it doesn't fit the threshold, the full text if it does.
     """
-
-    # We use binary search to find the proper length
-    def _binary_search(base: int, i: int):
-        # Get current size
-        size = d_font.getsize(text[:base + i] + "...")[0]
-        # Get next size
-        size1 = d_font.getsize(text[:base + i + 1] + "...")[0]
-        # If target is between both sizes, return
-        if size <= threshold <= size1:
-            return base + i
-        # If we reached the minimum resolution, return (one letter)
-        if i == 1:
-            return base + i + 1
-        # Else if text is too big, try smaller
-        if size >= threshold:
-            return _binary_search(base, i // 2)
-        # Else if text is too small, try bigger
-        if size <= threshold:
-            return _binary_search(base + i, i // 2)
-
     # If the text already fits the threshold, return it
-    if d_font.getsize(text)[0] <= threshold:
+    if _text_width(text, d_font) <= threshold:
         return text
 
-    # Else find where to cut the text off
-    res = _binary_search(0, len(text))
+    # Else use binary search to find the longest prefix fitting with the "..."
+    low = 0
+    high = len(text)
+    while low < high:
+        mid = (low + high + 1) // 2
+        if d_font.getsize(text[:mid] + "...")[0] <= threshold:
+            low = mid
+        else:
+            high = mid - 1
     # Return the cut text
-    return text[:res] + "..."
+    return text[:low] + "..."
 
 
-def _team_display(img: Image, draw: ImageDraw, team: 'classes.TeamScore', y_offset: int):
+def _get_y_off(layout: tuple, team_id: int) -> int:
+    """
+    Get the y coordinate of a team block.
+
+    :param layout: Tuple: number of players of each team.
+    :param team_id: Id of the team.
+    :return: y coordinate in pixel to start drawing the team from.
+    """
+    y_space = 0
+    # Calculate spacing depending on the number of players of each team
+    for k in range(team_id):
+        y_space += Y_SPACING * layout[k] + 480
+    return 325 + Y_SPACING * 4 + y_space
+
+
+@lru_cache(maxsize=16)
+def _make_template(layout: tuple) -> Image:
+    """
+    Create the static layer of the match image: everything which doesn't depend on the match results
+    (background, logo, borders, team separators and column titles).
+    Results are cached: each layout is only drawn once. The returned image must not be modified.
+
+    :param layout: Tuple: number of players of each team.
+    :return: Template image.
+    """
+    # Create image
+    y_max = _get_y_off(layout, len(layout))
+    x_max = IMAGE_WIDTH
+    img = Image.new('RGB', (x_max, y_max), color=(17, 0, 68))
+
+    # Add POG logo
+    logo = _get_asset("../logos/bot.png", (600, 600))
+    img.paste(logo, (180, 100), logo)
+
+    draw = ImageDraw.Draw(img)
+
+    # Draw enclosing square
+    b_thickness = 25
+    draw.line([b_thickness, 0, b_thickness, y_max], fill=(0, 0, 0), width=b_thickness * 2)
+    draw.line([0, b_thickness, x_max, b_thickness], fill=(0, 0, 0), width=b_thickness * 2)
+    draw.line([0, y_max - b_thickness, x_max, y_max - b_thickness], fill=(0, 0, 0), width=b_thickness * 2)
+    draw.line([x_max - b_thickness, 0, x_max - b_thickness, y_max], fill=(0, 0, 0), width=b_thickness * 2)
+
+    for team_id in range(len(layout)):
+        y_offset = _get_y_off(layout, team_id)
+        # Team lines
+        draw.line([b_thickness * 2, y_offset - 20, x_max - b_thickness * 2, y_offset - 20], fill=white, width=10)
+        draw.line([100, y_offset + Y_BIG_SPACE * 2 - 20, x_max - 100, y_offset + Y_BIG_SPACE * 2 - 20],
+                  fill=yellow, width=10)
+        # Draw Titles:
+        _draw_score_line(draw, X_OFFSET + 2200, y_offset, ["Score", "Net", "Kills", "Deaths", "HSR"], font, yellow)
+
+    return img
+
+
+def _team_display(img: Image, draw: ImageDraw, team: SimpleNamespace, y_offset: int):
     """
     Draw one team score.
 
     :param img: Image to draw on.
     :param draw: Draw object.
-    :param team: TeamScore object.
+    :param team: Team snapshot, see :meth:`_snapshot`.
     :param y_offset: y coordinate to start drawing score from
     """
-    # Draw Titles:
-    _draw_score_line(draw, X_OFFSET + 2200, y_offset, ["Score", "Net", "Kills", "Deaths", "HSR"], font, yellow)
-
     # Draw team scores:
     scores = [str(team.score), str(team.net), str(team.kills), str(team.deaths), f"{int(team.hsr * 100)}%"]
     _draw_score_line(draw, X_OFFSET + 2200, Y_SPACING + y_offset, scores, big_font, white)
@@ -141,13 +259,12 @@ def _team_display(img: Image, draw: ImageDraw, team: 'classes.TeamScore', y_offs
                   fill=color[i % 2])
 
         # Get two main classes (loadouts) the player used
-        loadouts = player.get_main_loadouts()
+        loadouts = player.main_loadouts
 
         # Draw loadouts icons
         for j in range(len(loadouts)):
             # Get loadout icon
-            loadout_img = Image.open(f"../media/{loadouts[j]}.png")
-            loadout_img = loadout_img.resize((80, 80))
+            loadout_img = _get_asset(f"../media/{loadouts[j]}.png", (80, 80))
             if len(loadouts) == 1:
                 # If only one loadout used, we put the icon in the middle
                 off = 90 // 2
@@ -157,40 +274,45 @@ def _team_display(img: Image, draw: ImageDraw, team: 'classes.TeamScore', y_offs
             img.paste(loadout_img, (35 + X_OFFSET + off, Y_BIG_SPACE * 2 + Y_SPACING * i + y_offset + 25), loadout_img)
 
 
-def _make_image(match: 'match.classes.MatchData'):
+def _snapshot(match: 'MatchData') -> SimpleNamespace:
     """
-    Create the match image, save it as '../../POG-data/matches/match_{match.id}.png'
+    Copy the data needed to draw the match image into simple objects,
+    which can be sent to the rendering processes.
 
     :param match: MatchData object to take the match results from
+    :return: Match snapshot.
     """
+    teams = list()
+    for tm in match.teams:
+        players = list()
+        for p in tm.players:
+            players.append(SimpleNamespace(name=p.name, ig_name=p.ig_name, score=p.score, net=p.net, kills=p.kills,
+                                           deaths=p.deaths, hsr=p.hsr, main_loadouts=p.get_main_loadouts()))
+        teams.append(SimpleNamespace(id=tm.id, name=tm.name, faction=tm.faction, score=tm.score, net=tm.net,
+                                     kills=tm.kills, deaths=tm.deaths, hsr=tm.hsr, cap=tm.cap,
+                                     nb_players=tm.nb_players, players=players))
+    return SimpleNamespace(id=match.id, base_name=match.base.name, round_stamps=list(match.round_stamps),
+                           round_length=match.round_length, teams=teams)
+
+
+def _draw_image(match: SimpleNamespace) -> Image:
+    """
+    Draw the match image: copy the template matching the teams layout, then draw the results on top.
 
-    # Return y-coordinate offset depending on the team
-    def get_y_off(team_id):
-        y_space = 0
-        # Calculate spacing depending on the number of players of each team
-        for k in range(team_id):
-            y_space += Y_SPACING * match.teams[k].nb_players + 480
-        return 325 + Y_SPACING * 4 + y_space
-
-    # Create image
-    y_max = get_y_off(len(match.teams))
-    x_max = 4000
-    img = Image.new('RGB', (x_max, y_max), color=(17, 0, 68))
-
-    # Add POG logo
-    logo = Image.open("../logos/bot.png")
-    logo = logo.resize((600, 600))
-    img.paste(logo, (180, 100), logo)
+    :param match: Match snapshot, see :meth:`_snapshot`
+    :return: The match image.
+    """
+    layout = tuple(tm.nb_players for tm in match.teams)
+    img = _make_template(layout).copy()
 
-    # Get draw object and x offset
+    # Get draw object
     draw = ImageDraw.Draw(img)
 
-
     # Draw general information
-    x_title = (x_max - big_font.getsize(f"Planetside Open Games - Match {match.id}")[0]) // 2
+    x_title = (IMAGE_WIDTH - _text_width(f"Planetside Open Games - Match {match.id}", big_font)) // 2
     x = x_title + 100
     draw.text((x_title, 100), f"Planetside Open Games - Match {match.id}", font=big_font, fill=white)
-    draw.text((x, 200 + 100), f"Base: {match.base.name}", font=small_font, fill=white)
+    draw.text((x, 200 + 100), f"Base: {match.base_name}", font=small_font, fill=white)
 
     # Draw round stamps times
     for i in range(len(match.round_stamps)):
@@ -201,64 +323,426 @@ def _make_image(match: 'match.classes.MatchData'):
     # If match is still ongoing, draw Round 2 as "In progress..."
     if len(match.round_stamps) < 2:
         draw.text((x, 200 + 100 * 3), f"Round 2: ", font=small_font, fill=white)
-        draw.text((x + small_font.getsize("Round 2: ")[0], 200 + 100 * 3), f"In progress...", font=small_font,
+        draw.text((x + _text_width("Round 2: ", small_font), 200 + 100 * 3), f"In progress...", font=small_font,
                   fill=yellow)
 
     # Draw round length
     draw.text((x, 200 + 100 * 4), f"Round length: {match.round_length} minutes", font=small_font, fill=white)
 
-    # Draw enclosing square
-    b_thickness = 25
-    draw.line([b_thickness, 0, b_thickness, y_max], fill=(0, 0, 0), width=b_thickness * 2)
-    draw.line([0, b_thickness, x_max, b_thickness], fill=(0, 0, 0), width=b_thickness * 2)
-    draw.line([0, y_max - b_thickness, x_max, y_max - b_thickness], fill=(0, 0, 0), width=b_thickness * 2)
-    draw.line([x_max - b_thickness, 0, x_max - b_thickness, y_max], fill=(0, 0, 0), width=b_thickness * 2)
-
-    # Team lines
-    for tm in match.teams:
-        y_offset = get_y_off(tm.id)
-        draw.line([b_thickness * 2, y_offset - 20, x_max - b_thickness * 2, y_offset - 20], fill=white, width=10)
-        draw.line([100, y_offset + Y_BIG_SPACE * 2 - 20, x_max - 100, y_offset + Y_BIG_SPACE * 2 - 20],
-                  fill=yellow, width=10)
-
     # Draw captures points information
     draw.text((x + 1100, 200 + 100), f"Captures:", font=small_font, fill=white)
     for tm in match.teams:
         draw.text((x + 1100, 200 + 100 * (tm.id + 2)), f"{tm.name}: {tm.cap} points", font=small_font,
                   white=white)
         # Draw teams and players score
-        _team_display(img, draw, tm, get_y_off(tm.id))
+        _team_display(img, draw, tm, _get_y_off(layout, tm.id))
+
+    return img
+
+
+def _preview_scale(layout: tuple) -> float:
+    """
+    Get the scale of the preview image: the taller the image, the smaller the scale.
+
+    :param layout: Tuple: number of players of each team.
+    :return: Scale to apply to the image.
+    """
+    pixels = IMAGE_WIDTH * _get_y_off(layout, len(layout))
+    scale = sqrt(PREVIEW_MAX_PIXELS / pixels)
+    return max(PREVIEW_MIN_SCALE, min(1.0, scale))
+
+
+def _encode(img: Image, scale: float = 1.0) -> bytes:
+    """
+    Encode the image with the format defined by :data:`IMAGE_FORMAT`.
+
+    :param img: Image to encode.
+    :param scale: (Optional) Scale to apply to the image before encoding.
+    :return: The encoded image.
+    """
+    if scale != 1.0:
+        img = img.resize((int(img.width * scale), int(img.height * scale)), Image.LANCZOS)
+    buffer = BytesIO()
+    if IMAGE_FORMAT == "webp":
+        img.save(buffer, format="WEBP", lossless=True, method=4)
+    else:
+        img = img.quantize(colors=PALETTE_COLORS, method=Image.FASTOCTREE)
+        img.save(buffer, format="PNG", optimize=PNG_OPTIMIZE)
+    return buffer.getvalue()
+
+
+def _make_image(match: SimpleNamespace, preview: bool = False) -> tuple:
+    """
+    Create the match image and encode it. This is run in the rendering processes.
+
+    :param match: Match snapshot, see :meth:`_snapshot`
+    :param preview: (Optional) Encode a downscaled preview instead of the full resolution image.
+    :return: Tuple: the encoded image and its encoding time in seconds.
+    """
+    img = _draw_image(match)
+    scale = _preview_scale(tuple(tm.nb_players for tm in match.teams)) if preview else 1.0
+    start = perf_counter()
+    data = _encode(img, scale)
+    return data, perf_counter() - start
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        # Spawn rather than fork: the bot process runs several threads
+        _pool = ProcessPoolExecutor(max_workers=RENDER_WORKERS, mp_context=get_context("spawn"))
+    return _pool
+
 
-    # Save the image
+async def _run_in_pool(fct, *args):
+    """
+    Run a rendering function in the process pool, or in a thread if the pool is broken.
+    A broken pool is shut down, a new one is started on the next call.
+
+    :param fct: Function to run, must be picklable.
+    :param args: Arguments of the function.
+    :return: Result of the function.
+    """
+    global _pool
+    loop = get_event_loop()
+    pool = _get_pool()
     try:
-        os.makedirs('../../POG-data/matches')
-    except FileExistsError:
-        pass
-    img.save(f'../../POG-data/matches/match_{match.id}.png')
+        return await loop.run_in_executor(pool, fct, *args)
+    except BrokenProcessPool:
+        log.error("Image rendering process pool is broken, rendering in a thread instead")
+        # Pool may already have been replaced by another render
+        if _pool is pool:
+            _pool = None
+        pool.shutdown(wait=False)
+        return await loop.run_in_executor(None, fct, *args)
 
 
-async def publish_match_image(match: 'match.classes.Match'):
+async def _render(snapshot: SimpleNamespace, preview: bool = False) -> bytes:
     """
-    Display the match score sheet in the result channel.
+    Render the match image in the process pool.
 
-    :param match: Match object
+    :param snapshot: Match snapshot, see :meth:`_snapshot`
+    :param preview: (Optional) Render a downscaled preview instead of the full resolution image.
+    :return: The encoded image.
+    """
+    data, encode_time = await _run_in_pool(_make_image, snapshot, preview)
+    log.info(f"Match {snapshot.id} image{' preview' if preview else ''}: {len(data)} bytes ({IMAGE_FORMAT}), "
+             f"encoded in {encode_time * 1000:.0f} ms")
+    return data
+
+
+async def render_match_image(match: 'MatchData', preview: bool = False) -> bytes:
     """
-    # Make image
+    Render the match image in the process pool.
+
+    :param match: MatchData object to take the match results from
+    :param preview: (Optional) Render a downscaled preview instead of the full resolution image.
+    :return: The encoded image.
+    """
+    return await _render(_snapshot(match), preview)
+
+
+def image_filename(m_id: int) -> str:
+    return f"match_{m_id}.{IMAGE_FORMAT}"
+
+
+def _write_file(path: str, data: bytes):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as file:
+        file.write(data)
+
+
+async def _archive_image(snapshot: SimpleNamespace, data: bytes = None):
+    """
+    Save the match image in :data:`ARCHIVE_FOLDER`.
+
+    :param snapshot: Match snapshot, see :meth:`_snapshot`
+    :param data: (Optional) Encoded image, rendered if not provided.
+    """
+    if data is None:
+        data = await _render(snapshot)
     loop = get_event_loop()
-    await loop.run_in_executor(None, _make_image, match.data)
+    try:
+        await loop.run_in_executor(None, _write_file, f"{ARCHIVE_FOLDER}/{image_filename(snapshot.id)}", data)
+    except OSError as e:
+        log.error(f"Could not archive image of match {snapshot.id}: {e}")
 
-    # If already posted once
-    if match.result_msg:
+
+class _ImagePublisher:
+    """
+    Publish the images of one match in the result channel.
+    The first image is sent, the following ones edit the same message.
+    Requests received while an image is being published are coalesced: only the latest snapshot is published.
+
+    :param m_id: Match id.
+    """
+    def __init__(self, m_id: int):
+        self.m_id = m_id
+        self.message = None
+        self.pending = None
+        self.is_running = False
+
+    def push(self, snapshot: SimpleNamespace):
+        self.pending = snapshot
+        if not self.is_running:
+            self.is_running = True
+            Loop(coro=self._publish_loop, count=1).start()
+
+    async def _publish_loop(self):
+        try:
+            while self.pending:
+                snapshot = self.pending
+                self.pending = None
+                await self._publish(snapshot)
+        finally:
+            self.is_running = False
+
+    async def _publish(self, snapshot: SimpleNamespace):
         try:
-            await match.result_msg.delete()
-        except discord.NotFound:
-            pass
-
-    # If end of match image
-    if len(match.round_stamps) == 2:
-        match.result_msg = await display.SC_RESULT.image_send(ContextWrapper.channel(cfg.channels["results"]),
-                                                              f'../../POG-data/matches/match_{match.id}.png', match.id)
-    else:  # Else it is the half-match image
-        match.result_msg = await display.SC_RESULT_HALF.image_send(ContextWrapper.channel(cfg.channels["results"]),
-                                                                   f'../../POG-data/matches/match_{match.id}.png',
-                                                                   match.id)
+            data = await _render(snapshot, preview=PUBLISH_PREVIEW)
+            if ARCHIVE_IMAGES:
+                # Archive the full resolution image
+                Loop(coro=_archive_image, count=1).start(snapshot, None if PUBLISH_PREVIEW else data)
+
+            # If end of match image
+            if len(snapshot.round_stamps) == 2:
+                msg = display.SC_RESULT
+            else:  # Else it is the half-match image
+                msg = display.SC_RESULT_HALF
+
+            # If already posted once, replace the image
+            if self.message:
+                try:
+                    image = discord.File(BytesIO(data), filename=image_filename(snapshot.id))
+                    self.message = await msg.image_edit(self.message, image, snapshot.id)
+                    return
+                except discord.NotFound:
+                    pass
+            image = discord.File(BytesIO(data), filename=image_filename(snapshot.id))
+            self.message = await msg.image_send(ContextWrapper.channel(cfg.channels["results"]), image, snapshot.id)
+        except Exception as e:
+            # Should not happen
+            log.error(f"Error when publishing image of match {snapshot.id}: {e}")
+            await display.PUBLISH_RENDER_ERROR.send(ContextWrapper.channel(cfg.channels["results"]), snapshot.id,
+                                                    len(snapshot.round_stamps))
+
+
+_publishers = dict()
+
+
+def publish_match_image(match: 'Match'):
+    """
+    Display the match score sheet in the result channel.
+    The match data is copied right away, the image is then rendered and published in the background.
+
+    :param match: Match object
+    """
+    snapshot = _snapshot(match.data)
+    if snapshot.id not in _publishers:
+        _publishers[snapshot.id] = _ImagePublisher(snapshot.id)
+    _publishers[snapshot.id].push(snapshot)
+
+
+def on_match_clean(m_id: int):
+    """
+    Forget the publisher of a match, to be called when the match is cleaned.
+    An image still being published is published anyway.
+
+    :param m_id: Id of the match.
+    """
+    _publishers.pop(m_id, None)
+
+
+# Stats cards:
+
+STATS_WIDTH = 2400
+STATS_HEIGHT = 1750
+
+_stats_cache = OrderedDict()
+
+
+def _loadout_display_name(name: str) -> str:
+    return " ".join(word[0].upper() + word[1:] for word in name.split('_'))
+
+
+def _stats_snapshot(stats: 'PlayerStat', recent_stats: 'PlayerStat') -> SimpleNamespace:
+    """
+    Copy the data needed to draw the stats card into simple objects,
+    which can be sent to the rendering processes.
+
+    :param stats: All time stats of the player.
+    :param recent_stats: Recent stats of the player, their match scores are used for the score trend.
+    :return: Stats snapshot.
+    """
+    # Merge the loadouts of the different factions
+    weights = dict()
+    for loadout in stats.loadouts.values():
+        name = cfg.loadout_id[loadout.id]
+        weights[name] = weights.get(name, 0) + loadout.weight
+    loadouts = sorted(weights.items(), key=lambda item: item[1], reverse=True)
+    trend = [recent_stats.match_scores[m_id] for m_id in sorted(recent_stats.match_scores)][-TREND_LENGTH:]
+    return SimpleNamespace(id=stats.id, name=stats.name, nb_matches=stats.nb_matches_played,
+                           last_match=stats.matches[-1] if stats.matches else 0,
+                           time_played=stats.time_played, kpm=round(stats.kpm, 3),
+                           kills_per_match=round(stats.kills_per_match, 1), score=stats.score,
+                           kills=stats.kills, deaths=stats.deaths, loadouts=loadouts, trend=trend,
+                           recent_matches=recent_stats.nb_matches_played, recent_score=recent_stats.score)
+
+
+def stats_card_key(stats: 'PlayerStat', recent_matches: list) -> tuple:
+    """
+    Key of a stats card in the render cache. Stats of a player only change when they play a match or change
+    name, and recent stats when a match gets old, so the key can be computed without getting the recent stats.
+
+    :param stats: All time stats of the player.
+    :param recent_matches: Ids of the recent matches of the player,
+        see :meth:`modules.stat_processor.get_recent_matches`.
+    :return: The key.
+    """
+    return stats.id, stats.name, stats.nb_matches_played, stats.matches[-1] if stats.matches else 0, \
+        tuple(recent_matches)
+
+
+def get_stats_card(key: tuple):
+    """
+    Get a stats card from the render cache.
+
+    :param key: Key of the card, see :meth:`stats_card_key`.
+    :return: The encoded image, None if the card is not in cache.
+    """
+    try:
+        _stats_cache.move_to_end(key)
+        return _stats_cache[key]
+    except KeyError:
+        return None
+
+
+def _draw_trend(draw: ImageDraw.ImageDraw, box: tuple, trend: list):
+    """
+    Draw the score of the recent matches as a line chart.
+
+    :param draw: ImageDraw object to draw on.
+    :param box: Tuple: (x_min, y_min, x_max, y_max) area of the chart.
+    :param trend: List of scores, from the oldest to the latest match.
+    """
+    x_min, y_min, x_max, y_max = box
+    draw.line([x_min, y_max, x_max, y_max], fill=grey2, width=5)
+    if not trend:
+        draw.text((x_min + 50, (y_min + y_max) // 2 - 40), "No recent match", font=small_font, fill=grey2)
+        return
+    low = min(0, *trend)
+    high = max(1, *trend)
+
+    def point(i, value):
+        x = (x_min + x_max) // 2 if len(trend) == 1 else x_min + i * (x_max - x_min) // (len(trend) - 1)
+        return x, y_max - (value - low) * (y_max - y_min) // (high - low)
+
+    if low < 0:
+        # Zero line
+        zero = point(0, 0)[1]
+        draw.line([x_min, zero, x_max, zero], fill=grey2, width=3)
+    points = [point(i, value) for i, value in enumerate(trend)]
+    if len(points) > 1:
+        draw.line(points, fill=yellow, width=8, joint="curve")
+    for x, y in points:
+        draw.ellipse([x - 12, y - 12, x + 12, y + 12], fill=white)
+    draw.text((x_min - _text_width(str(high), small_font) - 30, y_min - 40), str(high), font=small_font, fill=grey1)
+    draw.text((x_min - _text_width(str(low), small_font) - 30, y_max - 40), str(low), font=small_font, fill=grey1)
+
+
+def _draw_stats_card(stats: SimpleNamespace) -> Image:
+    """
+    Draw the stats card of a player.
+
+    :param stats: Stats snapshot, see :meth:`_stats_snapshot`
+    :return: The stats card image.
+    """
+    img = Image.new('RGB', (STATS_WIDTH, STATS_HEIGHT), color=(17, 0, 68))
+    draw = ImageDraw.Draw(img)
+
+    # Enclosing square
+    b_thickness = 25
+    draw.rectangle([b_thickness, b_thickness, STATS_WIDTH - b_thickness, STATS_HEIGHT - b_thickness],
+                   outline=(0, 0, 0), width=b_thickness * 2)
+
+    # Header: logo and name
+    logo = _get_asset("../logos/bot.png", (300, 300))
+    img.paste(logo, (100, 80), logo)
+    draw.text((450, 110), _cut_off_string(stats.name, big_font, STATS_WIDTH - 550), font=big_font, fill=white)
+    draw.text((450, 250), "Planetside Open Games stats", font=small_font, fill=yellow)
+    draw.line([100, 420, STATS_WIDTH - 100, 420], fill=yellow, width=10)
+
+    # General stats
+    values = [("Matches played", str(stats.nb_matches)),
+              ("Play time", f"{stats.time_played / 60:.1f} hours"),
+              ("Total score", str(stats.score)),
+              ("Kills per minute", f"{stats.kpm:.2f}"),
+              ("Kills per match", f"{stats.kills_per_match:.1f}"),
+              ("Kills / Deaths", f"{stats.kills} / {stats.deaths}")]
+    for i, (title, value) in enumerate(values):
+        y = 480 + i * Y_SPACING
+        draw.text((X_OFFSET, y), title, font=small_font, fill=grey1)
+        draw.text((X_OFFSET + 600, y), value, font=small_font, fill=white)
+
+    # Most played loadout
+    x_load = 1350
+    draw.text((x_load, 480), "Most played class", font=small_font, fill=grey1)
+    if stats.loadouts:
+        name, weight = stats.loadouts[0]
+        icon = _get_asset(f"../media/{name}.png", (200, 200))
+        img.paste(icon, (x_load, 580), icon)
+        draw.text((x_load + 250, 620), _loadout_display_name(name), font=font, fill=white)
+    else:
+        draw.text((x_load, 580), "None", font=font, fill=white)
+
+    # Class icons, with the share of play time of each class
+    total = sum(weight for _, weight in stats.loadouts)
+    for i, (name, weight) in enumerate(stats.loadouts):
+        x = x_load + (i % 3) * 330
+        y = 830 + (i // 3) * 100
+        icon = _get_asset(f"../media/{name}.png", (80, 80))
+        img.paste(icon, (x, y), icon)
+        draw.text((x + 100, y), f"{int(weight * 100 / total)}%", font=small_font, fill=white)
+
+    # Score trend of the recent matches
+    y_trend = 1300
+    draw.line([100, y_trend - 40, STATS_WIDTH - 100, y_trend - 40], fill=white, width=5)
+    draw.text((X_OFFSET, y_trend), "Score trend", font=small_font, fill=yellow)
+    draw.text((X_OFFSET, y_trend + 100), f"{stats.recent_matches} recent matches", font=small_font, fill=grey1)
+    draw.text((X_OFFSET, y_trend + 200), f"Recent score: {stats.recent_score}", font=small_font, fill=grey1)
+    _draw_trend(draw, (1050, y_trend + 40, STATS_WIDTH - 150, STATS_HEIGHT - 120), stats.trend)
+
+    return img
+
+
+def _make_stats_card(stats: SimpleNamespace) -> bytes:
+    """
+    Create the stats card and encode it. This is run in the rendering processes.
+
+    :param stats: Stats snapshot, see :meth:`_stats_snapshot`
+    :return: The encoded image.
+    """
+    return _encode(_draw_stats_card(stats))
+
+
+def stats_card_filename(p_id: int) -> str:
+    return f"stats_{p_id}.{IMAGE_FORMAT}"
+
+
+async def render_stats_card(key: tuple, stats: 'PlayerStat',
+                            recent_stats: 'PlayerStat') -> bytes:
+    """
+    Render the stats card of a player in the process pool.
+    Encoded cards are cached, check the cache with :meth:`get_stats_card` before getting the recent stats.
+
+    :param key: Key of the card, see :meth:`stats_card_key`.
+    :param stats: All time stats of the player.
+    :param recent_stats: Recent stats of the player, see :meth:`modules.stat_processor.get_new_stats`.
+    :return: The encoded image.
+    """
+    snapshot = _stats_snapshot(stats, recent_stats)
+    data = await _run_in_pool(_make_stats_card, snapshot)
+    _stats_cache[key] = data
+    if len(_stats_cache) > STATS_CACHE_SIZE:
+        _stats_cache.popitem(last=False)
+    return data
@@ -1,9 +1,16 @@
+"""
+| Handle the Jaeger calendar, used to know which bases are currently booked.
+| The calendar is downloaded and compiled into a :class:`BookingIndex` by :meth:`refresh`.
+| Then :meth:`is_base_booked` can be queried as often as needed.
+"""
+
 from gspread import service_account
 from datetime import datetime as dt, timezone as tz, timedelta as td
 from numpy import array as np_array
 from re import compile as reg_compile, sub as reg_sub
+from bisect import bisect_right
 
-from modules.tools import date_parser
+from modules.tools import date_parser, timestamp_now
 
 import modules.config as cfg
 
@@ -11,7 +18,87 @@ from logging import getLogger
 
 log = getLogger("pog_bot")
 
+# Minimum time between two downloads of the calendar (in seconds)
+REFRESH_DELAY = 600
+
 _secret_file = ""
+_index = None
+_last_refresh = 0
+
+_SPLITTING_CHARS = ['/', ',', '&', '(', ')']
+_CLEAN_PATTERN = reg_compile("[^a-zA-Z0-9 ]")
+
+
+class BookingIndex:
+    """
+    Interval index of the Jaeger calendar bookings.
+    Holds, for each base id, a sorted list of disjoint (start, end) timestamps so that
+    booking queries can be answered with a binary search.
+    """
+    def __init__(self):
+        self.__intervals = dict()
+        self.__starts = dict()
+
+    def add(self, base_id: int, start: float, end: float):
+        """
+        Add a booking to the index. :meth:`build` must be called once all bookings are added.
+
+        :param base_id: Id of the booked base.
+        :param start: Start timestamp of the booking.
+        :param end: End timestamp of the booking.
+        """
+        if end < start:
+            start, end = end, start
+        if base_id not in self.__intervals:
+            self.__intervals[base_id] = list()
+        self.__intervals[base_id].append((start, end))
+
+    def build(self):
+        """
+        Sort and merge the overlapping bookings of each base.
+        """
+        for base_id, intervals in self.__intervals.items():
+            intervals.sort()
+            merged = list()
+            for start, end in intervals:
+                if merged and start <= merged[-1][1]:
+                    merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+                else:
+                    merged.append((start, end))
+            self.__intervals[base_id] = merged
+            self.__starts[base_id] = [start for start, _ in merged]
+
+    def is_booked(self, base_id: int, start: float, end: float = None) -> bool:
+        """
+        Check if a base is booked at any moment between start and end.
+
+        :param base_id: Id of the base to check.
+        :param start: Start timestamp of the period to check.
+        :param end: (Optional) End timestamp of the period to check, defaults to start.
+        :return: True if a booking overlaps the period.
+        """
+        if base_id not in self.__starts:
+            return False
+        if end is None:
+            end = start
+        # Last booking starting before the end of the period
+        i = bisect_right(self.__starts[base_id], end) - 1
+        if i < 0:
+            return False
+        return self.__intervals[base_id][i][1] >= start
+
+    def get_booked_ids(self, start: float, end: float = None) -> list:
+        """
+        Get the ids of all the bases booked between start and end.
+
+        :param start: Start timestamp of the period to check.
+        :param end: (Optional) End timestamp of the period to check, defaults to start.
+        :return: List of booked base ids.
+        """
+        return [base_id for base_id in self.__starts if self.is_booked(base_id, start, end)]
+
+    def __len__(self):
+        return sum(len(intervals) for intervals in self.__intervals.values())
 
 
 def init(secret_file):
@@ -19,48 +106,91 @@ def init(secret_file):
     _secret_file = secret_file
 
 
-def get_booked_bases(base_class, booked_bases_list):  # runs on class init, saves a list of booked bases at the time of init to self.booked
-    index_start = index_end = None
+def invalidate():
+    """
+    Force the next call of :meth:`refresh` to download and compile the calendar again.
+    """
+    global _last_refresh
+    _last_refresh = 0
+
+
+def refresh(base_class, force=False):
+    """
+    Download the calendar and compile today's and tomorrow's bookings into the booking index.
+    This is a blocking call, it should be run in an executor.
+    Nothing is done if the calendar was already compiled less than :data:`REFRESH_DELAY` seconds ago.
+
+    :param base_class: Base class used to identify the bases from their names.
+    :param force: Refresh even if the calendar was compiled recently.
+    """
+    global _index, _last_refresh
+    if not force and _index is not None and _last_refresh > timestamp_now() - REFRESH_DELAY:
+        return
     gc = service_account(filename=_secret_file)
     sh = gc.open_by_key(cfg.database["jaeger_cal"])
     ws = sh.worksheet("Current")
     cal_export = np_array(ws.get_all_values())
-    date_col = cal_export[:,0]
-    for index, value in enumerate(date_col):
-        if not index_start and value == dt.now(tz.utc).strftime('%b-%d'):
-            # gets us the header for the current date section in the google sheet
-            index_start = index + 1
-            continue
-        if value == (dt.now(tz.utc) + td(days=1)).strftime('%b-%d'):
-            # gets us the header for tomorrow's date in the sheet
-            index_end = index  # now we know the range on the google sheet to look for base availability
-            break
-    if index_start is None or index_end is None:
-        log.warning(f"Unable to find date range in Jaeger calendar for today's date. Returned: '{index_start}' "
-                    f"to '{index_end}'")
-        return
 
+    now = dt.now(tz.utc)
+    days = [(now + td(days=i)).strftime('%b-%d') for i in range(3)]
+    headers = dict()
+    for index, value in enumerate(cal_export[:, 0]):
+        if value in days and value not in headers:
+            headers[value] = index
+    if days[0] not in headers:
+        log.warning(f"Unable to find date range in Jaeger calendar for today's date '{days[0]}'")
+        # Don't download the calendar again on every query, the previous bookings are kept if any
+        if _index is None:
+            _index = BookingIndex()
+        _last_refresh = timestamp_now()
+        return
 
-    today_bookings = cal_export[index_start:index_end]
+    # Bookings of today and tomorrow, tomorrow is needed for queries close to midnight
+    index_start = headers[days[0]] + 1
+    index_end = headers.get(days[2], len(cal_export))
+    bookings = [row for i, row in enumerate(cal_export[index_start:index_end], index_start)
+                if i != headers.get(days[1])]
 
-    for booking in today_bookings:
+    new_index = BookingIndex()
+    identified = dict()
+    for booking in bookings:
         try:
             start_time = date_parser(booking[10])  # 45 mins before start of reservation
             if booking[11] != "":
                 end_time = date_parser(booking[11])
             else:
                 end_time = date_parser(booking[9])
-            if start_time <= dt.now(tz.utc) <= end_time:
-                splitting_chars = ['/', ',', '&', '(', ')']
-                booked_bases = booking[3]
-                for sc in splitting_chars:
-                    booked_bases = booked_bases.replace(sc, ';')
-                booked_bases = [_identify_base_from_name(base, base_class) for base in booked_bases.split(";")]
-                for booked in booked_bases:
-                    if booked is not None and booked not in booked_bases_list:
-                        booked_bases_list.append(booked)
-        except (ValueError, TypeError) as e:
+            start_stamp = start_time.timestamp()
+            end_stamp = end_time.timestamp()
+            booked_bases = booking[3]
+            for sc in _SPLITTING_CHARS:
+                booked_bases = booked_bases.replace(sc, ';')
+            for name in booked_bases.split(";"):
+                if name not in identified:
+                    identified[name] = _identify_base_from_name(name, base_class)
+                if identified[name] is not None:
+                    new_index.add(identified[name].id, start_stamp, end_stamp)
+        except (ValueError, TypeError, AttributeError) as e:
             log.warning(f"Skipping invalid line in Jaeger Calendar:\n{booking}\nError: {e}")
+    new_index.build()
+
+    _index = new_index
+    _last_refresh = timestamp_now()
+    log.info(f"Jaeger calendar compiled: {len(new_index)} bookings")
+
+
+def is_base_booked(base, minutes=0) -> bool:
+    """
+    Check if a base is booked now, or at any moment in the next minutes.
+
+    :param base: Base to check.
+    :param minutes: (Optional) Length of the period to check, in minutes.
+    :return: True if the base is booked.
+    """
+    if _index is None:
+        return False
+    now = timestamp_now()
+    return _index.is_booked(base.id, now, now + minutes * 60)
 
 
 def _identify_base_from_name(name, base_class):
@@ -69,12 +199,18 @@ def _identify_base_from_name(name, base_class):
         return
 
     # Use regex to clean the string from unwanted characters
-    pattern = reg_compile("[^a-zA-Z0-9 ]")
-    name = reg_sub(" {2,}", " ", pattern.sub('', name)).strip()
+    name = reg_sub(" {2,}", " ", _CLEAN_PATTERN.sub('', name)).strip()
 
     # Add all matching bases to list
     results = base_class.get_bases_from_name(name)
 
+    # Typo in the calendar: only accept an unambiguous close name
+    if not results:
+        results = base_class.get_bases_from_name(name, fuzzy=True)
+        if len(results) != 1:
+            return
+        log.info(f"Jaeger calendar: '{name}' identified as '{results[0].name}'")
+
     # If only one matching base
     if len(results) == 1:
         return results[0]
@@ -0,0 +1,200 @@
+"""
+| Append-only journal of the lobby and match states, used to recover after a crash or a restart.
+| Each state change is appended to :data:`JOURNAL_FILE` as one JSON line. The latest line for a lobby
+  (or for a match channel) always holds its full state, so replaying only means keeping the last line of each.
+| Every :data:`SNAPSHOT_EVERY` lines, the current state is written to :data:`SNAPSHOT_FILE` and the journal
+  is truncated.
+| Nothing is recorded before :meth:`replay` is called on startup, so the previous journal is never overwritten
+  before being read.
+| A heartbeat is recorded every :data:`HEARTBEAT_DELAY` seconds, so the stamp of the journal tells when the bot
+  was last running even if nothing changed since.
+| Files are written in order by a single task, in a thread so the event loop never waits for the disk.
+"""
+
+from asyncio import get_event_loop
+from collections import deque
+from logging import getLogger
+from threading import Lock
+import json
+import os
+
+from lib.tasks import Loop
+from modules.tools import timestamp_now
+
+log = getLogger("pog_bot")
+
+# Files of the journal
+JOURNAL_FOLDER = "../../POG-data"
+JOURNAL_FILE = f"{JOURNAL_FOLDER}/journal.jsonl"
+SNAPSHOT_FILE = f"{JOURNAL_FOLDER}/journal_snapshot.json"
+
+# Number of journal lines before a snapshot is taken
+SNAPSHOT_EVERY = 200
+
+# Lobby and matches are not restored if the bot was stopped for longer than this (in seconds)
+RESUME_DELAY = 900
+
+# Delay between two heartbeats (in seconds)
+HEARTBEAT_DELAY = 60
+
+# Name given to the lobby of the journals written before lobbies had names
+LEGACY_LOBBY = "lobby"
+
+_state = {"stamp": 0, "lobbies": dict(), "matches": dict()}
+_file = None
+_nb_lines = 0
+
+# Writes waiting for the writer task: (is snapshot, data)
+_pending = deque()
+_is_writing = False
+# Held while writing, the pending writes may be flushed from the signal handler during a write
+_write_lock = Lock()
+
+
+def is_loaded() -> bool:
+    return _file is not None
+
+
+def _apply(state: dict, entry: dict):
+    state["stamp"] = entry["stamp"]
+    if entry["type"] == "lobby":
+        state["lobbies"][entry.get("name", LEGACY_LOBBY)] = entry["ids"]
+    elif entry["type"] == "match":
+        if entry["state"] is None:
+            state["matches"].pop(entry["channel"], None)
+        else:
+            state["matches"][entry["channel"]] = entry["state"]
+
+
+def _write_snapshot(data: str):
+    global _file
+    os.makedirs(JOURNAL_FOLDER, exist_ok=True)
+    tmp = f"{SNAPSHOT_FILE}.tmp"
+    with open(tmp, "w") as file:
+        file.write(data)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(tmp, SNAPSHOT_FILE)
+    # Snapshot is safely written, the journal can be emptied
+    if _file:
+        _file.close()
+    _file = open(JOURNAL_FILE, "w")
+
+
+def _write(is_snapshot: bool, data: str):
+    with _write_lock:
+        try:
+            if is_snapshot:
+                _write_snapshot(data)
+            else:
+                _file.write(data)
+                _file.flush()
+        except OSError as e:
+            log.error(f"Journal: could not record entry: {e}")
+
+
+async def _writer():
+    global _is_writing
+    loop = get_event_loop()
+    try:
+        while _pending:
+            await loop.run_in_executor(None, _write, *_pending.popleft())
+    finally:
+        _is_writing = False
+
+
+def flush():
+    """
+    Write the pending entries immediately, blocking. Used when the event loop is stopping.
+    """
+    while _pending:
+        _write(*_pending.popleft())
+
+
+def replay() -> dict:
+    """
+    Read the last snapshot and the journal, then start recording.
+
+    :return: The state when the bot stopped: dict with "stamp" (timestamp of the last change or heartbeat),
+        "lobbies" (lists of player ids by lobby name) and "matches" (match states by channel id, see
+        :meth:`match.classes.match.MatchObjects.get_journal_state`).
+    """
+    global _state
+    state = {"stamp": 0, "lobbies": dict(), "matches": dict()}
+    try:
+        with open(SNAPSHOT_FILE, "r") as file:
+            state = json.load(file)
+    except FileNotFoundError:
+        pass
+    except (OSError, ValueError) as e:
+        log.error(f"Journal: could not read snapshot: {e}")
+    # Snapshots written before lobbies had names
+    if "lobby" in state:
+        state.setdefault("lobbies", dict())[LEGACY_LOBBY] = state.pop("lobby")
+    nb_lines = 0
+    try:
+        with open(JOURNAL_FILE, "r") as file:
+            for line in file:
+                try:
+                    _apply(state, json.loads(line))
+                    nb_lines += 1
+                except (ValueError, KeyError):
+                    # Last line may be incomplete after a crash
+                    log.warning(f"Journal: skipping invalid line: {line!r}")
+    except FileNotFoundError:
+        pass
+    nb_lobbied = sum(len(ids) for ids in state["lobbies"].values())
+    log.info(f"Journal: replayed {nb_lines} lines, {nb_lobbied} players in lobby, "
+             f"{len(state['matches'])} matches")
+    _state = state
+    _write(True, json.dumps(_state))
+    Loop(coro=_heartbeat, seconds=HEARTBEAT_DELAY, count=None).start()
+    return json.loads(json.dumps(state))
+
+
+def _record(entry: dict):
+    global _nb_lines, _is_writing
+    if not _file:
+        return
+    entry["stamp"] = timestamp_now()
+    _apply(_state, entry)
+    _pending.append((False, json.dumps(entry) + "\n"))
+    _nb_lines += 1
+    if _nb_lines >= SNAPSHOT_EVERY:
+        # State is serialized now, it could change before being written
+        _pending.append((True, json.dumps(_state)))
+        _nb_lines = 0
+    if not _is_writing:
+        _is_writing = True
+        Loop(coro=_writer, count=1).start()
+
+
+async def _heartbeat():
+    record_heartbeat()
+
+
+def record_heartbeat():
+    """
+    Record that the bot is still running.
+    """
+    _record({"type": "heartbeat"})
+
+
+def record_lobby(name: str, ids: list):
+    """
+    Record the content of a lobby.
+
+    :param name: Name of the lobby.
+    :param ids: Ids of the players in lobby, in queue order.
+    """
+    _record({"type": "lobby", "name": name, "ids": ids})
+
+
+def record_match(channel_id: int, state: dict = None):
+    """
+    Record the state of a match.
+
+    :param channel_id: Id of the match channel.
+    :param state: State of the match, None if the match channel is free again.
+    """
+    _record({"type": "match", "channel": str(channel_id), "state": state})
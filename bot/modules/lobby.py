@@ -1,24 +1,259 @@
+"""
+| Handle the lobbies (queues of players waiting for a match).
+| Several lobbies can run in parallel, see :data:`modules.config.lobbies`. Each lobby has its own channel, size,
+  auto-ping threshold and pool of match channels. A player can only be in one lobby at a time.
+"""
+
 import modules.config as cfg
 from display import AllStrings as disp, ContextWrapper, views, InteractionContext
 
-from lib.tasks import Loop, loop
+from lib.tasks import Loop
 from logging import getLogger
 
-import modules.tools as tools
 import modules.interactions as interactions
+import modules.scheduler as scheduler
+import modules.journal as journal
 
 log = getLogger("pog_bot")
 
-_lobby_list = list()
-_lobby_stuck = False
 _MatchClass = None
 _client = None
-_warned_players = dict()
 
+# Lobbies by lobby channel id
+_lobbies = dict()
+# Lobbies by name
+_lobbies_by_name = dict()
+# Lobbies by match channel id
+_match_lobbies = dict()
+# Lobby of each lobbied player, by player id
+_player_lobbies = dict()
+
+# Time in lobby before the player is warned, then removed (in seconds)
+WARNING_DELAY = 7200
+EXPIRY_DELAY = 7800
+
+
+class Lobby:
+    """
+    Queue of players feeding a pool of match channels.
+    Players are kept in a dict by id: dicts keep the insertion order, which is the queue order.
+
+    :param name: Name of the lobby.
+    :param channel_id: Id of the lobby channel.
+    :param size: Number of players needed to start a match.
+    :param match_channels: Ids of the match channels this lobby can use.
+    """
+    def __init__(self, name: str, channel_id: int, size: int, match_channels: list):
+        self.name = name
+        self.channel_id = channel_id
+        self.size = size
+        self.match_channels = match_channels
+        self.__players = dict()
+        # Incremented on every lobby change, used to know when the cached names are outdated
+        self.__version = 0
+        self.__names_cache = (-1, tuple())
+        self.__stuck = False
+        self.__warned_players = dict()
+        self.__auto_ping = Loop(coro=self.__auto_ping_loop, minutes=3, delay=1, count=2)
+        self.__auto_ping_already = False
+
+    @property
+    def display_name(self):
+        return self.name.capitalize()
+
+    @property
+    def version(self):
+        """
+        Incremented on every change of the lobby or of the names of its players.
+        """
+        return self.__version
+
+    @property
+    def channel(self):
+        return ContextWrapper.channel(self.channel_id)
+
+    def __on_lobby_change(self):
+        self.__version += 1
+        journal.record_lobby(self.name, list(self.__players.keys()))
+
+    def __schedule_timeout(self, player):
+        scheduler.schedule(("lobby_warning", player.id), player.lobby_stamp + WARNING_DELAY, self.__on_warning,
+                           player)
+        scheduler.schedule(("lobby_expiry", player.id), player.lobby_stamp + EXPIRY_DELAY, self.__on_expiry, player)
+
+    @staticmethod
+    def __cancel_timeout(player):
+        scheduler.cancel(("lobby_warning", player.id))
+        scheduler.cancel(("lobby_expiry", player.id))
+
+    def reset_timeout(self, player):
+        self.__remove_from_warned(player)
+        player.reset_lobby_timestamp()
+        self.__schedule_timeout(player)
+
+    def __remove_from_warned(self, p):
+        if p.id in self.__warned_players:
+            self.__warned_players.pop(p.id).clean()
+
+    def __clear_warned(self):
+        for k in list(self.__warned_players.values()):
+            k.clean()
+        self.__warned_players.clear()
+        # Cancel the timeouts of all the players in lobby
+        for p in self.__players.values():
+            self.__cancel_timeout(p)
+
+    def __add_ih_callback(self, ih, player):
+        @ih.callback('reset')
+        async def on_user_react(p, interaction_id, interaction, interaction_values):
+            user = interaction.user
+            if user.id == player.id:
+                ctx = self.channel
+                ctx.author = user
+                self.reset_timeout(player)
+                await disp.LB_REFRESHED.send(ctx)
+            else:
+                i_ctx = InteractionContext(interaction)
+                await disp.LB_REFRESH_NO.send(i_ctx)
+                raise interactions.InteractionNotAllowed
+
+    def is_lobby_stuck(self):
+        return self.__stuck
+
+    async def __on_expiry(self, p):
+        if p.id not in self.__players:
+            return
+        self.remove_from_lobby(p)
+        await disp.LB_TOO_LONG.send(self.channel, p.mention, names_in_lobby=self.get_all_names_in_lobby(),
+                                    lobby=self)
+
+    async def __on_warning(self, p):
+        if p.id not in self.__players or p.id in self.__warned_players:
+            return
+        ih = interactions.InteractionHandler(p, views.reset_button)
+        self.__warned_players[p.id] = ih
+        self.__add_ih_callback(ih, p)
+        ctx = ih.get_new_context(self.channel)
+        await disp.LB_WARNING.send(ctx, p.mention)
+
+    def __auto_ping_threshold(self):
+        thresh = self.size - self.size // 3
+        return thresh
+
+    def __auto_ping_cancel(self):
+        self.__auto_ping.cancel()
+        self.__auto_ping_already = False
+
+    def get_sub(self, player):
+        # Check if someone in lobby, if not return player (might be None)
+        if len(self.__players) == 0:
+            return player
+        # If player is None, take first player in queue
+        if not player:
+            player = next(iter(self.__players.values()))
+        # If player chosen is in lobby, remove
+        if player.id in self.__players:
+            del self.__players[player.id]
+            del _player_lobbies[player.id]
+            self.__on_lobby_remove()
+            self.__remove_from_warned(player)
+            self.__cancel_timeout(player)
+        return player
 
-def reset_timeout(player):
-    _remove_from_warned(player)
-    player.reset_lobby_timestamp()
+    def add_to_lobby(self, player):
+        self.__players[player.id] = player
+        _player_lobbies[player.id] = self
+        self.__on_lobby_change()
+        all_names = self.get_all_names_in_lobby()
+        player.on_lobby_add()
+        self.__schedule_timeout(player)
+        if len(self.__players) == self.size:
+            self.__start_match_from_full_lobby()
+        elif len(self.__players) >= self.__auto_ping_threshold():
+            if not self.__auto_ping.is_running() and not self.__auto_ping_already:
+                self.__auto_ping.start()
+                self.__auto_ping_already = True
+        return all_names
+
+    async def __auto_ping_loop(self):
+        if _MatchClass.find_empty(self.match_channels) is None:
+            return
+        await disp.LB_NOTIFY.send(self.channel, f'<@&{cfg.roles["notify"]}>', len(self.__players), self.size)
+
+    def get_lobby_len(self):
+        return len(self.__players)
+
+    def get_all_names_in_lobby(self):
+        """
+        Get the names of the players in lobby, in queue order.
+        The names are only rebuilt when the lobby changed since the last call.
+
+        :return: Tuple of the names.
+        """
+        version, names = self.__names_cache
+        if version != self.__version:
+            names = tuple(f"{p.mention} ({p.name})" for p in self.__players.values())
+            self.__names_cache = (self.__version, names)
+        return names
+
+    def refresh_names(self):
+        """
+        Force the names of the players in lobby to be rebuilt, to be called when a player changes name.
+        """
+        self.__version += 1
+
+    def get_all_ids_in_lobby(self):
+        ids = list(self.__players.keys())
+        return ids
+
+    def remove_from_lobby(self, player):
+        self.__remove_from_warned(player)
+        self.__cancel_timeout(player)
+
+        del self.__players[player.id]
+        del _player_lobbies[player.id]
+        self.__on_lobby_remove()
+        player.on_lobby_leave()
+
+    def on_match_free(self):
+        self.__auto_ping_already = False
+        if len(self.__players) == self.size:
+            self.__start_match_from_full_lobby()
+
+    def __on_lobby_remove(self):
+        self.__on_lobby_change()
+        self.__stuck = False
+        if len(self.__players) < self.__auto_ping_threshold():
+            self.__auto_ping_cancel()
+
+    def __start_match_from_full_lobby(self):
+        match = _MatchClass.find_empty(self.match_channels)
+        self.__auto_ping_cancel()
+        if match is None:
+            self.__stuck = True
+            Loop(coro=self.__send_stuck_msg, count=1).start()
+        else:
+            self.__stuck = False
+            match.spin_up(list(self.__players.values()))
+            self.__clear_warned()
+            for p_id in self.__players:
+                del _player_lobbies[p_id]
+            self.__players.clear()
+            self.__on_lobby_change()
+
+    async def __send_stuck_msg(self):
+        await disp.LB_STUCK.send(self.channel)
+
+    def clear_lobby(self):
+        if len(self.__players) == 0:
+            return False
+        for p in self.__players.values():
+            p.on_lobby_leave()
+            del _player_lobbies[p.id]
+        self.__clear_warned()
+        self.__players.clear()
+        self.__on_lobby_remove()
+        return True
 
 
 def init(m_cls, client):
@@ -26,169 +261,83 @@ def init(m_cls, client):
     global _client
     _MatchClass = m_cls
     _client = client
-    _lobby_loop.start()
+    for name, lb_cfg in cfg.lobbies.items():
+        lb = Lobby(name, lb_cfg["channel"], lb_cfg["size"], lb_cfg["matches"])
+        _lobbies[lb.channel_id] = lb
+        _lobbies_by_name[name] = lb
+        for ch_id in lb.match_channels:
+            _match_lobbies[ch_id] = lb
 
 
-def _remove_from_warned(p):
-    if p in _warned_players:
-        _warned_players[p].clean()
-        del _warned_players[p]
+def get_lobby(channel_id: int):
+    """
+    :param channel_id: Id of a lobby channel.
+    :return: Lobby of this channel, None if the channel is not a lobby channel.
+    """
+    return _lobbies.get(channel_id)
 
 
-def _clear_warned():
-    for k in list(_warned_players.values()):
-        k.clean()
-    _warned_players.clear()
-
-
-def _add_ih_callback(ih, player):
-    @ih.callback('reset')
-    async def on_user_react(p, interaction_id, interaction, interaction_values):
-        user = interaction.user
-        if user.id == player.id:
-            ctx = ContextWrapper.channel(cfg.channels["lobby"])
-            ctx.author = user
-            reset_timeout(player)
-            await disp.LB_REFRESHED.send(ctx)
-        else:
-            i_ctx = InteractionContext(interaction)
-            await disp.LB_REFRESH_NO.send(i_ctx)
-            raise interactions.InteractionNotAllowed
-
+def get_lobby_by_name(name: str):
+    return _lobbies_by_name.get(name)
 
-def is_lobby_stuck():
-    return _lobby_stuck
 
+def get_main_lobby() -> Lobby:
+    """
+    :return: The lobby of the main lobby channel, or the first lobby if this channel is not a lobby.
+    """
+    try:
+        return _lobbies[cfg.channels["lobby"]]
+    except KeyError:
+        return next(iter(_lobbies.values()))
 
-def _set_lobby_stuck(bl):
-    global _lobby_stuck
-    _lobby_stuck = bl
 
+def get_all_lobbies() -> list:
+    return list(_lobbies.values())
 
-# 7800, 7200
-@loop(minutes=5)
-async def _lobby_loop():
-    for p in _lobby_list:
-        now = tools.timestamp_now()
-        if p.lobby_stamp < (now - 7800):
-            remove_from_lobby(p)
-            await disp.LB_TOO_LONG.send(ContextWrapper.channel(cfg.channels["lobby"]), p.mention,
-                                        names_in_lobby=get_all_names_in_lobby())
-        elif p.lobby_stamp < (now - 7200):
-            if p not in _warned_players:
-                ih = interactions.InteractionHandler(p, views.reset_button)
-                _warned_players[p] = ih
-                _add_ih_callback(ih, p)
-                ctx = ih.get_new_context(ContextWrapper.channel(cfg.channels["lobby"]))
-                await disp.LB_WARNING.send(ctx, p.mention)
-
-
-def _auto_ping_threshold():
-    thresh = cfg.general["lobby_size"] - cfg.general["lobby_size"] // 3
-    return thresh
-
-
-def _auto_ping_cancel():
-    _auto_ping.cancel()
-    _auto_ping.already = False
-
-
-def get_sub(player):
-    # Check if someone in lobby, if not return player (might be None)
-    if len(_lobby_list) == 0:
-        return player
-    # If player is None, take first player in queue
-    if not player:
-        player = _lobby_list[0]
-    # If player chosen is in lobby, remove
-    if player.is_lobbied:
-        _lobby_list.remove(player)
-        _on_lobby_remove()
-        _remove_from_warned(player)
-    return player
 
+def get_match_lobby(channel_id: int) -> Lobby:
+    """
+    :param channel_id: Id of a match channel.
+    :return: Lobby feeding this match channel, the main lobby if there is none.
+    """
+    try:
+        return _match_lobbies[channel_id]
+    except KeyError:
+        return get_main_lobby()
 
-def add_to_lobby(player):
-    _lobby_list.append(player)
-    all_names = get_all_names_in_lobby()
-    player.on_lobby_add()
-    if len(_lobby_list) == cfg.general["lobby_size"]:
-        _start_match_from_full_lobby()
-    elif len(_lobby_list) >= _auto_ping_threshold():
-        if not _auto_ping.is_running() and not _auto_ping.already:
-            _auto_ping.start()
-            _auto_ping.already = True
-    return all_names
 
+def get_player_lobby(player):
+    """
+    :param player: Player object.
+    :return: Lobby the player is in, None if the player is not lobbied.
+    """
+    return _player_lobbies.get(player.id)
 
-@loop(minutes=3, delay=1, count=2)
-async def _auto_ping():
-    if _MatchClass.find_empty() is None:
-        return
-    await disp.LB_NOTIFY.send(ContextWrapper.channel(cfg.channels["lobby"]), f'<@&{cfg.roles["notify"]}>',
-                              get_lobby_len(), cfg.general["lobby_size"])
 
+def remove_from_lobby(player) -> Lobby:
+    """
+    Remove a player from the lobby they are in.
 
-_auto_ping.already = False
+    :param player: Player to remove.
+    :return: Lobby the player was in, None if the player was not lobbied.
+    """
+    lb = get_player_lobby(player)
+    if lb:
+        lb.remove_from_lobby(player)
+    return lb
 
 
-def get_lobby_len():
-    return len(_lobby_list)
-
-
-def get_all_names_in_lobby():
-    names = [f"{p.mention} ({p.name})" for p in _lobby_list]
-    return names
-
-
-def get_all_ids_in_lobby():
-    ids = [p.id for p in _lobby_list]
-    return ids
-
-
-def remove_from_lobby(player):
-    _remove_from_warned(player)
-
-    _lobby_list.remove(player)
-    _on_lobby_remove()
-    player.on_lobby_leave()
-
-
-def on_match_free():
-    _auto_ping.already = False
-    if len(_lobby_list) == cfg.general["lobby_size"]:
-        _start_match_from_full_lobby()
-
-
-def _on_lobby_remove():
-    _set_lobby_stuck(False)
-    if len(_lobby_list) < _auto_ping_threshold():
-        _auto_ping_cancel()
-
-
-def _start_match_from_full_lobby():
-    match = _MatchClass.find_empty()
-    _auto_ping_cancel()
-    if match is None:
-        _set_lobby_stuck(True)
-        Loop(coro=_send_stuck_msg, count=1).start()
-    else:
-        _set_lobby_stuck(False)
-        match.spin_up(_lobby_list.copy())
-        _lobby_list.clear()
-        _clear_warned()
+def reset_timeout(player):
+    lb = get_player_lobby(player)
+    if lb:
+        lb.reset_timeout(player)
 
 
-async def _send_stuck_msg():
-    await disp.LB_STUCK.send(ContextWrapper.channel(cfg.channels["lobby"]))
+def refresh_names(player):
+    lb = get_player_lobby(player)
+    if lb:
+        lb.refresh_names()
 
 
-def clear_lobby():
-    if len(_lobby_list) == 0:
-        return False
-    for p in _lobby_list:
-        p.on_lobby_leave()
-    _lobby_list.clear()
-    _clear_warned()
-    _on_lobby_remove()
-    return True
+def on_match_free(channel_id: int):
+    get_match_lobby(channel_id).on_match_free()
@@ -2,11 +2,11 @@
 """
 
 from display import AllStrings as disp, ContextWrapper
-from discord import DMChannel, NotFound
+from discord import DMChannel
+from asyncio import gather
 import modules.config as cfg
 from modules.loader import is_all_locked
-from modules.roles import is_admin
-from asyncio import sleep
+from modules.roles import is_admin, get_member
 import modules.spam_checker as spam_checker
 from modules.dm_handler import on_dm
 
@@ -70,6 +70,7 @@ async def on_message(client, message):
         args = message.content.split()
 
         new_args = list()
+        ids = list()
         for arg in args:
             if '@' in arg:
                 continue
@@ -79,21 +80,19 @@ async def on_message(client, message):
                 pass
             else:
                 if arg_int >= 21154535154122752:  # minimum number for discord id
-                    member = message.channel.guild.get_member(arg_int)
-                    if member:
-                        message.mentions.append(member)
-                        continue
-                    try:
-                        member = await message.channel.guild.fetch_member(arg_int)
-                    except NotFound:
-                        message.mentions.append(FakeMember(arg_int))
-                        continue
-                    if member:
-                        message.mentions.append(member)
-                        continue
+                    ids.append(arg_int)
+                    continue
 
             new_args.append(arg)
 
+        if ids:
+            # Resolve all the ids at once
+            unique_ids = list(dict.fromkeys(ids))
+            members = await gather(*(get_member(m_id, fetch=True) for m_id in unique_ids))
+            members = dict(zip(unique_ids, members))
+            for m_id in ids:
+                message.mentions.append(members[m_id] or FakeMember(m_id))
+
         message.content = " ".join(new_args)
 
         # Check for =as command
@@ -110,8 +109,6 @@ async def on_message(client, message):
                 return
 
         await client.process_commands(message)  # if not spam, processes
-
-        # Call finished, we can release user
-        await sleep(0.5)
     finally:
+        # Call finished, we can release user
         spam_checker.unlock(actual_author.id)
@@ -1,15 +1,47 @@
 # @CHECK 2.0 features OK
 
 import modules.config as cfg
+import modules.scheduler as scheduler
 
-from discord import Status
+from discord import Status, HTTPException, NotFound
+from asyncio import Semaphore, gather
+from collections import OrderedDict
+from logging import getLogger
+from time import time
+
+from lib.tasks import Loop
+
+log = getLogger("pog_bot")
+
+# Number of members updated at the same time for live updates
+SYNC_CONCURRENCY = 5
+# Number of members updated at the same time by the startup sync, which has its own limit so it never delays
+# the live updates
+STARTUP_SYNC_CONCURRENCY = 2
+
+# Presence changes of a member are batched over this window (in seconds)
+PRESENCE_DEBOUNCE = 30
+
+# Number of fetched members kept in cache
+MEMBER_CACHE_SIZE = 500
+# Time fetched members are cached (in seconds)
+MEMBER_TTL = 300
+# Time unknown ids are cached (in seconds)
+UNKNOWN_TTL = 60
+
+_sync_semaphore = None
+_startup_semaphore = None
+# Fetched members by id: (expiry timestamp, member or None if unknown), least recently used first
+_members = OrderedDict()
 
 _roles_dict = dict()
 _guild = None
 
 
 def init(client):
-    global _guild
+    global _guild, _sync_semaphore, _startup_semaphore
+    _sync_semaphore = Semaphore(SYNC_CONCURRENCY)
+    _startup_semaphore = Semaphore(STARTUP_SYNC_CONCURRENCY)
     _guild = client.get_channel(cfg.channels["rules"]).guild
     for role in cfg.roles.keys():
         _roles_dict[role] = _guild.get_role(cfg.roles[role])
@@ -29,50 +61,194 @@ def is_muted(member):
     return _roles_dict["muted"] in member.roles
 
 
-async def remove_roles(p_id):
+async def get_member(p_id, fetch=False):
+    """
+    Get a guild member.
+    In low-memory mode, the member cache of the library is disabled: members are fetched on demand and the
+    last :data:`MEMBER_CACHE_SIZE` are kept for :data:`MEMBER_TTL` seconds (:data:`UNKNOWN_TTL` for unknown ids).
+
+    :param p_id: Id of the member.
+    :param fetch: (Optional) Fetch the members missing from the library cache even outside of low-memory mode.
+    :return: The member, None if they are not in the guild.
+    """
     memb = _guild.get_member(p_id)
+    if memb or not (cfg.low_memory or fetch):
+        return memb
+    now = time()
+    try:
+        expiry, memb = _members[p_id]
+        if expiry > now:
+            _members.move_to_end(p_id)
+            return memb
+    except KeyError:
+        pass
+    try:
+        memb = await _guild.fetch_member(p_id)
+        _members[p_id] = (now + MEMBER_TTL, memb)
+    except NotFound:
+        memb = None
+        _members[p_id] = (now + UNKNOWN_TTL, None)
+    _members.move_to_end(p_id)
+    while len(_members) > MEMBER_CACHE_SIZE:
+        _members.popitem(last=False)
+    return memb
+
+
+async def remove_roles(p_id):
+    memb = await get_member(p_id)
     if memb is None:
         return
-    if _roles_dict["registered"] in memb.roles:
-        await memb.remove_roles(_roles_dict["registered"])
-    if _roles_dict["notify"] in memb.roles:
-        await memb.remove_roles(_roles_dict["notify"])
+    await _sync_member(memb, set())
 
 
-async def role_update(player):
-    if player.is_timeout:
-        await remove_roles(player.id)
-        return
-    if player.is_away:
-        await remove_roles(player.id)
-        return
-    await perms_muted(False, player.id)
-    memb = _guild.get_member(player.id)
+def _get_desired_roles(player, memb) -> set:
+    """
+    Get the roles managed by the bot that a member should have.
+
+    :param player: Player object of the member.
+    :param memb: Discord member.
+    :return: Set of roles among "registered" and "notify".
+    """
+    if player.is_timeout or player.is_away:
+        return set()
+    if player.is_notify and is_available(memb.status) and not (player.is_lobbied or player.match):
+        return {_roles_dict["notify"]}
+    return {_roles_dict["registered"]}
+
+
+async def _sync_member(memb, desired: set) -> bool:
+    """
+    Give a member the desired managed roles, only if they don't already have them.
+    Only the difference is sent, so the roles changed by others in the meantime are kept.
+
+    :param memb: Discord member.
+    :param desired: Set of the managed roles the member should have.
+    :return: True if the member roles were edited.
+    """
+    managed = (_roles_dict["registered"], _roles_dict["notify"])
+    current = {role for role in memb.roles if role in managed}
+    if current == desired:
+        return False
+    if cfg.low_memory:
+        # Cached member is outdated now
+        _members.pop(memb.id, None)
+    if desired - current:
+        await memb.add_roles(*(desired - current))
+    if current - desired:
+        await memb.remove_roles(*(current - desired))
+    return True
+
+
+async def role_update(player) -> bool:
+    """
+    Update the roles of a player.
+
+    :param player: Player to update.
+    :return: True if the member roles were edited.
+    """
+    memb = await get_member(player.id)
     if memb is None:
+        return False
+    if not (player.is_timeout or player.is_away):
+        await perms_muted(False, player.id)
+    return await _sync_member(memb, _get_desired_roles(player, memb))
+
+
+def is_available(status) -> bool:
+    """
+    :param status: Discord status of a member.
+    :return: True if a member with this status can have the notify role.
+    """
+    # Status is unknown in low-memory mode
+    if cfg.low_memory:
+        return True
+    return status not in (Status.offline, Status.dnd)
+
+
+async def _sync(player, semaphore=None) -> bool:
+    async with semaphore or _sync_semaphore:
+        try:
+            return await role_update(player)
+        except HTTPException as e:
+            log.warning(f"Role sync failed for player id:[{player.id}]: {e}")
+            return False
+
+
+def queue_update(player, delay: float = 0):
+    """
+    Queue a role update for a player, run at most :data:`SYNC_CONCURRENCY` at a time.
+    Updates queued while one is already pending for the same player are merged into it.
+
+    :param player: Player to update.
+    :param delay: Time to wait for other changes before updating (in seconds).
+    """
+    key = ("role_update", player.id)
+    deadline = time() + delay
+    pending = scheduler.get_deadline(key)
+    if pending is None or deadline < pending:
+        scheduler.schedule(key, deadline, _sync, player)
+
+
+def on_presence_update(player, before, after):
+    """
+    Queue a role update after a status change, only if it changes the notify eligibility.
+    Changes are batched over :data:`PRESENCE_DEBOUNCE` seconds, so a member flickering between statuses
+    is only updated once.
+
+    :param player: Player whose status changed.
+    :param before: Previous discord status.
+    :param after: New discord status.
+    """
+    if not player.is_notify or is_available(before) == is_available(after):
         return
-    if player.is_notify and memb.status not in (Status.offline, Status.dnd) and not (player.is_lobbied or player.match):
-        if _roles_dict["notify"] not in memb.roles:
-            await memb.add_roles(_roles_dict["notify"])
-        if _roles_dict["registered"] in memb.roles:
-            await memb.remove_roles(_roles_dict["registered"])
+    queue_update(player, delay=PRESENCE_DEBOUNCE)
+
+
+def sync_all(players: list):
+    """
+    Update the roles of all the players in the background, :data:`STARTUP_SYNC_CONCURRENCY` members at a time.
+
+    :param players: Players to update.
+    """
+    Loop(coro=_sync_all, count=1).start(players)
+
+
+async def _sync_all(players):
+    start = time()
+    results = await gather(*(_sync(p, _startup_semaphore) for p in players))
+    log.info(f"Role sync: {sum(results)} members updated out of {len(players)} players in {time() - start:.1f}s")
+
+
+def schedule_timeout_end(player):
+    """
+    Free the player when their timeout ends. Cancel the previous deadline if the timeout was removed.
+    """
+    if player.is_timeout:
+        scheduler.schedule(("timeout", player.id), player.timeout, _on_timeout_end, player)
     else:
-        if _roles_dict["registered"] not in memb.roles:
-            await memb.add_roles(_roles_dict["registered"])
-        if _roles_dict["notify"] in memb.roles:
-            await memb.remove_roles(_roles_dict["notify"])
+        scheduler.cancel(("timeout", player.id))
+
+
+async def _on_timeout_end(player):
+    # Timeout may have been extended in the meantime
+    if player.is_timeout:
+        return
+    await role_update(player)
 
 
 async def perms_muted(value, p_id):
-    memb = _guild.get_member(p_id)
+    memb = await get_member(p_id)
     if memb is None:
         return
     channel = _guild.get_channel(cfg.channels["muted"])
+    # Overwrites are looked up by id, members may not be cached
+    has_overwrite = not channel.overwrites_for(memb).is_empty()
     if value:
         over = _guild.get_channel(cfg.channels["lobby"]).overwrites_for(_roles_dict["registered"])
-        if memb not in channel.overwrites:
+        if not has_overwrite:
             await channel.set_permissions(memb, overwrite=over)
     else:
-        if memb in channel.overwrites:
+        if has_overwrite:
             await channel.set_permissions(memb, overwrite=None)
 
 
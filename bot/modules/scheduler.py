@@ -0,0 +1,104 @@
+"""
+| Deadline scheduler: run a coroutine at a given timestamp.
+| Deadlines are kept in a heap and a single background task sleeps until the earliest one,
+  so any number of timers can be pending without polling.
+| Each deadline is identified by a key: scheduling again with the same key replaces the previous deadline.
+
+Example:
+
+.. code-block:: python
+
+    scheduler.schedule(("lobby_expiry", player.id), player.lobby_stamp + 7800, on_expiry, player)
+    scheduler.cancel(("lobby_expiry", player.id))
+"""
+
+from asyncio import Event, wait_for, TimeoutError
+from heapq import heappush, heappop
+from itertools import count
+from logging import getLogger
+from time import time
+
+from lib.tasks import Loop
+
+log = getLogger("pog_bot")
+
+# Heap of (deadline, sequence number, key)
+_heap = list()
+# Pending deadlines: key -> (deadline, sequence number, coroutine function, args)
+_entries = dict()
+_counter = count()
+_wakeup = None
+_runner = None
+
+
+def schedule(key, deadline, coro_fct, *args):
+    """
+    Run a coroutine function at the given timestamp.
+    If a deadline with the same key is already pending, it is replaced.
+
+    :param key: Hashable key identifying the deadline.
+    :param deadline: Timestamp (in seconds) when the coroutine function should be run.
+    :param coro_fct: Coroutine function to run.
+    :param args: Arguments for the coroutine function.
+    """
+    global _wakeup, _runner
+    seq = next(_counter)
+    _entries[key] = (deadline, seq, coro_fct, args)
+    heappush(_heap, (deadline, seq, key))
+    if _runner is None or not _runner.is_running():
+        _wakeup = Event()
+        _runner = Loop(coro=_run, count=1)
+        _runner.start()
+    # Wake the runner up if this deadline is the earliest
+    elif _heap[0][1] == seq:
+        _wakeup.set()
+
+
+def cancel(key) -> bool:
+    """
+    Cancel a pending deadline. Nothing is done if there is no deadline with this key.
+
+    :param key: Key of the deadline.
+    :return: True if a deadline was cancelled.
+    """
+    # The heap entry becomes stale and is discarded when it reaches the top
+    return _entries.pop(key, None) is not None
+
+
+def get_deadline(key):
+    """
+    :param key: Key of the deadline.
+    :return: Timestamp of the pending deadline, None if there is none.
+    """
+    try:
+        return _entries[key][0]
+    except KeyError:
+        return None
+
+
+def _is_stale(item) -> bool:
+    _, seq, key = item
+    return key not in _entries or _entries[key][1] != seq
+
+
+async def _run():
+    while True:
+        # Drop cancelled and replaced deadlines
+        while _heap and _is_stale(_heap[0]):
+            heappop(_heap)
+        _wakeup.clear()
+        if not _heap:
+            await _wakeup.wait()
+            continue
+        delay = _heap[0][0] - time()
+        if delay > 0:
+            try:
+                await wait_for(_wakeup.wait(), timeout=delay)
+            except TimeoutError:
+                pass
+            # Heap top may have changed, check again
+            continue
+        _, _, key = heappop(_heap)
+        deadline, _, coro_fct, args = _entries.pop(key)
+        log.debug(f"Scheduler: running {coro_fct.__name__} for {key}, {time() - deadline:.1f}s late")
+        Loop(coro=coro_fct, count=1).start(*args)
@@ -4,6 +4,7 @@ import sys
 
 import modules.lobby as lobby
 import modules.database as db
+import modules.journal as journal
 from logging import getLogger
 import asyncio
 
@@ -12,8 +13,11 @@ log = getLogger("pog_bot")
 
 def save_state(loop):
     log.info("SIGINT caught, saving state...")
-    lb = lobby.get_all_ids_in_lobby()
-    db.set_field("restart_data", 0, {"last_lobby": lb})
+    lbs = {lb.name: lb.get_all_ids_in_lobby() for lb in lobby.get_all_lobbies()}
+    db.set_field("restart_data", 0, {"last_lobby": lbs})
+    # Stamp of the journal is the time the bot stopped
+    journal.record_heartbeat()
+    journal.flush()
     log.info("Stopping...")
     loop.stop()
     sys.exit(0)
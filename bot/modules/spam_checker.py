@@ -1,54 +1,114 @@
+"""
+| Spam protection for commands and interactions.
+| A user can only run one request at a time: requests received while the previous one is running are ignored.
+  Requests are also throttled with a token bucket per user (:data:`BUCKET_SIZE` requests in a burst, then one
+  every :data:`REFILL_DELAY` seconds).
+| Users are forgotten after :data:`USER_TTL` seconds of inactivity, so memory only depends on the number of
+  active users.
+"""
+
 from logging import getLogger
+from collections import OrderedDict
+from time import time
 from display import AllStrings as disp, ContextWrapper
-import modules.tools as tools
-
-__spam_list = dict()
-__SPAM_MSG_FREQUENCY = 5
-__last_requests = dict()
 
 log = getLogger("pog_bot")
 
+# Number of requests a user can make in a burst
+BUCKET_SIZE = 5
+# Time to get one more request back (in seconds)
+REFILL_DELAY = 1
+# A user is automatically unlocked if their request is still running after this delay (in seconds)
+LOCK_TIMEOUT = 30
+# Users inactive for this long are forgotten (in seconds)
+USER_TTL = 120
+# Maximum number of users remembered
+MAX_USERS = 5000
+# A warning is sent every SPAM_MSG_FREQUENCY ignored requests
+SPAM_MSG_FREQUENCY = 5
+
+# Users by id, least recently active first
+_users = OrderedDict()
+
+
+class _User:
+    __slots__ = ("tokens", "stamp", "lock_stamp", "strikes")
+
+    def __init__(self, now):
+        self.tokens = BUCKET_SIZE
+        self.stamp = now
+        self.lock_stamp = 0
+        self.strikes = 0
+
+    @property
+    def is_locked(self):
+        return self.lock_stamp != 0
+
+    def refill(self, now):
+        self.tokens = min(BUCKET_SIZE, self.tokens + (now - self.stamp) / REFILL_DELAY)
+        self.stamp = now
+
+
+def _evict(now):
+    while _users:
+        a_id, user = next(iter(_users.items()))
+        if len(_users) <= MAX_USERS and user.stamp > now - USER_TTL:
+            break
+        del _users[a_id]
+
 
 async def is_spam(author, channel, ctx=None):
+    """
+    Check if a request should be ignored. If not, the user is locked until :meth:`unlock` is called.
+
+    :param author: User making the request.
+    :param channel: Channel of the request.
+    :param ctx: Context to use for the warning message, built from author and channel if None.
+    :return: True if the request should be ignored.
+    """
     a_id = author.id
-    if a_id in __spam_list and __spam_list[a_id] > 0:
-        if a_id in __last_requests and __last_requests[a_id] < tools.timestamp_now() - 30:
-            log.info(f"Automatically unlocked id[{a_id}], name[{author.name}] from spam filter")
-            unlock(a_id)
-    __last_requests[a_id] = tools.timestamp_now()
-    if a_id not in __spam_list:
-        __spam_list[a_id] = 1
+    now = time()
+    _evict(now)
+    try:
+        user = _users[a_id]
+        _users.move_to_end(a_id)
+    except KeyError:
+        user = _User(now)
+        _users[a_id] = user
+    if user.is_locked and user.lock_stamp < now - LOCK_TIMEOUT:
+        log.info(f"Automatically unlocked id[{a_id}], name[{author.name}] from spam filter")
+        user.lock_stamp = 0
+    user.refill(now)
+    if not user.is_locked and user.tokens >= 1:
+        user.tokens -= 1
+        user.lock_stamp = now
+        user.strikes = 0
         return False
-    __spam_list[a_id] += 1
-    if __spam_list[a_id] == 1:
-        return False
-    if __spam_list[a_id] % __SPAM_MSG_FREQUENCY == 0:
+    user.strikes += 1
+    if user.strikes % SPAM_MSG_FREQUENCY == 0:
         if not ctx:
             ctx = ContextWrapper.wrap(channel, author=author)
         await disp.STOP_SPAM.send(ctx)
     return True
 
 
-# This is never called:
-def clean():
-    tmp = __spam_list.copy()
-    for a_id in tmp:
-        if __spam_list[a_id] == 0:
-            del __spam_list[a_id]
-
-
 def debug():
+    """
+    :return: Number of ignored requests by user id, for the users currently spamming.
+    """
     result = dict()
-    for k in list(__spam_list.keys()):
-        if __spam_list[k] > 0:
-            result[k] = __spam_list[k]
+    for a_id, user in _users.items():
+        if user.strikes > 0:
+            result[a_id] = user.strikes
     return result
 
 
 def clear_spam_list():
-    __spam_list.clear()
+    _users.clear()
 
 
 def unlock(a_id):
-    __spam_list[a_id] = 0
-
+    try:
+        _users[a_id].lock_stamp = 0
+    except KeyError:
+        pass
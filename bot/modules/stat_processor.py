@@ -8,6 +8,9 @@ log = getLogger("pog_bot")
 
 _match_stamps = dict()
 
+# Matches played during this delay are the recent matches (in seconds)
+RECENT_DELAY = 1209600
+
 oldest = 0
 
 
@@ -44,7 +47,17 @@ def get_previous_week(date):
     return start, end
 
 
-async def get_new_stats(match_cls, player, time=tools.timestamp_now()-1209600):
+def get_recent_matches(player) -> list:
+    """
+    :param player: PlayerStat object.
+    :return: Ids of the matches played in the last :data:`RECENT_DELAY` seconds, latest first.
+    """
+    return get_matches_in_time(player, tools.timestamp_now() - RECENT_DELAY)
+
+
+async def get_new_stats(match_cls, player, time=None):
+    if time is None:
+        time = tools.timestamp_now() - RECENT_DELAY
     m_list = get_matches_in_time(player, time)
     new_p_stats = PlayerStat(player.id, player.name)
     for m_id in m_list:
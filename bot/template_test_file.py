@@ -69,7 +69,7 @@ async def launch(ctx, id_list, tier):
         players.append(player)
 
     for p in players:
-        lobby.add_to_lobby(p)
+        lobby.get_main_lobby().add_to_lobby(p)
 
     if tier == 1:
         return